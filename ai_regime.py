@@ -1,56 +1,66 @@
 import os
-import requests
 import logging
-import time
+import numpy as np
+from candle_store import timeframe_to_ms
+from sentiment import SentimentService
+
+SMA_LENGTH = 20  # Trend filter: close above/below its SMA
+
+
+def regime_series(timestamps, closes, timeframe='1h', length=SMA_LENGTH):
+    """detect_regime for every 1h bar of a history at once: 'BULLISH', 'BEARISH' or 'UNKNOWN'.
+
+    Higher timeframes are bucketed on UTC epoch boundaries like resample_ohlcv. The SMA window is
+    the last `length - 1` completed buckets plus the forming one, whose close is the current 1h
+    close, so each bar gets the regime a scan at that bar would have seen. Bucket closes are
+    summed with one prefix sum, so every bar costs O(1).
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    closes = np.asarray(closes, dtype=np.float64)
+    n = len(closes)
+    if timeframe == '1h':
+        sums = np.concatenate(([0.0], np.cumsum(closes)))
+        bar = np.arange(n)
+        window = sums[bar + 1] - sums[np.maximum(bar + 1 - length, 0)]
+        known = bar >= length - 1
+    else:
+        step = timeframe_to_ms(timeframe)
+        buckets = timestamps // step
+        new_bucket = np.r_[False, buckets[1:] != buckets[:-1]]
+        ends = np.r_[np.flatnonzero(new_bucket), n] - 1
+        bucket = np.cumsum(new_bucket)  # Bucket index of every bar
+        first_full = 0 if n == 0 or timestamps[0] % step == 0 else 1  # A partial first bucket is unusable
+        sums = np.concatenate(([0.0], np.cumsum(closes[ends])))
+        first = bucket - (length - 1)
+        window = sums[bucket] - sums[np.maximum(first, 0)] + closes
+        known = first >= first_full
+    return np.where(known, np.where(closes * length > window, 'BULLISH', 'BEARISH'), 'UNKNOWN')
+
 
 class AIRegimeDetector:
     def __init__(self):
         # Using the standard RoBERTa sentiment model via API
         self.api_url = "https://api-inference.huggingface.co/models/cardiffnlp/twitter-roberta-base-sentiment"
-        self.headers = {"Authorization": f"Bearer {os.getenv('HF_TOKEN')}"}
+        self.sentiment = SentimentService(self.api_url, os.getenv('HF_TOKEN'))
 
     def get_sentiment(self, text):
-        """Sends text to Hugging Face API with a built-in 'Wake Up' check."""
-        if not text:
-            return 0
-            
-        payload = {"inputs": text[:512], "options": {"wait_for_model": True}}
-        
-        try:
-            for attempt in range(3):  # Try 3 times if the model is loading
-                response = requests.post(self.api_url, headers=self.headers, json=payload, timeout=15)
-                result = response.json()
-
-                # Handle model loading (503 error)
-                if isinstance(result, dict) and "estimated_time" in result:
-                    wait_time = result.get("estimated_time", 20)
-                    logging.info(f"AI Model is warming up... waiting {wait_time}s")
-                    time.sleep(wait_time)
-                    continue
-                
-                # Success: result is a nested list [[{'label':..., 'score':...}]]
-                sentiment_data = result[0]
-                top_result = max(sentiment_data, key=lambda x: x['score'])
-                
-                # LABEL_0: Negative, LABEL_1: Neutral, LABEL_2: Positive
-                mapping = {"LABEL_0": -1, "LABEL_1": 0, "LABEL_2": 1}
-                return mapping.get(top_result['label'], 0) * top_result['score']
-                
-        except Exception as e:
-            logging.error(f"API Sentiment failed: {e}")
-            return 0
-        return 0
+        """Scores text in [-1, 1]; never waits on a cold model (falls back to local VADER instead)."""
+        return self.sentiment.score(text)
+
+    def get_sentiments(self, texts):
+        """Scores many texts at once, batching remote calls and reusing cached scores."""
+        return self.sentiment.score_many(texts)
 
     def detect_regime(self, df):
-        """Standard technical regime detection."""
+        """Standard technical regime detection on a DataFrame or CandleArray."""
         # Safety: Need at least 20 periods for a 20-period moving average
-        if df is None or len(df) < 20:
+        if df is None or len(df) < SMA_LENGTH:
             logging.warning("Insufficient data for regime detection.")
             return "UNKNOWN"
             
         # Calculate 20-period Simple Moving Average
-        sma20 = df['close'].rolling(window=20).mean()
-        current_price = df['close'].iloc[-1]
-        current_sma = sma20.iloc[-1]
+        closes = np.asarray(df['close'], dtype=np.float64)
+        current_price = closes[-1]
+        current_sma = closes[-SMA_LENGTH:].mean()
         
         return "BULLISH" if current_price > current_sma else "BEARISH"
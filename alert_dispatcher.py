@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import queue
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from database_manager import connect_sqlite
+
+MAX_EMBEDS = 10  # Discord accepts at most 10 embeds per webhook message
+
+_shared = {}  # (webhook_url, db path) -> the dispatcher every sender in this process uses
+_shared_lock = threading.Lock()
+
+
+def shared_dispatcher(webhook_url, db_path='signals.db'):
+    """The process-wide AlertDispatcher for a webhook and DB, started on first use.
+
+    Two dispatchers over one pending_alerts table would both re-queue the same rows and post
+    them twice, so every sender (DataCollector, DiscordAlerter) goes through here. Each caller
+    owns one reference and calls close(); the last close drains and stops the worker.
+    """
+    key = (webhook_url, os.path.abspath(db_path))
+    with _shared_lock:
+        dispatcher = _shared.get(key)
+        if dispatcher is None:
+            dispatcher = _shared[key] = AlertDispatcher(webhook_url, db_path)
+            dispatcher._key = key
+        else:
+            dispatcher._users += 1
+        return dispatcher
+
+
+class AlertDispatcher:
+    def __init__(self, webhook_url, db_path='signals.db', max_queue=1000, coalesce_window=1.0,
+                 timeout=10.0, max_attempts=8, max_backoff=60.0, session=None):
+        """Delivers webhook messages from a background thread so posting never blocks a cycle.
+
+        Every alert is written to the `pending_alerts` table before it is queued and deleted only
+        once Discord accepted it, so undelivered alerts are retried by the next process. Alerts that
+        arrive within `coalesce_window` seconds of each other are merged into one multi-embed
+        message. 429s wait for `retry_after`, an exhausted X-RateLimit bucket waits for its reset,
+        and network/5xx errors back off exponentially up to `max_attempts` tries per message.
+        """
+        self.webhook_url = webhook_url
+        self.coalesce_window = coalesce_window
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_backoff = max_backoff
+
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session = session
+
+        self._lock = threading.Lock()
+        self._conn = connect_sqlite(db_path)
+        self._init_db()
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflow = False  # Set when the queue was full: newer alerts wait in the table only
+        self._last_queued_id = 0
+        self._send_after = 0.0  # monotonic time the rate-limit bucket allows the next post
+        self._deadline = None
+        self._stop = threading.Event()
+        self._users = 1
+        self._key = None
+
+        restored = self._reload_pending()
+        if restored:
+            logging.info(f"📬 Re-queued {restored} undelivered alert(s) from a previous run.")
+        self._worker = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+        self._worker.start()
+
+    def _init_db(self):
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS pending_alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    payload TEXT NOT NULL,
+                    attempts INTEGER DEFAULT 0
+                )
+            ''')
+
+    def send(self, payload):
+        """Persists a webhook payload ({'content': ...} and/or {'embeds': [...]}) and queues it."""
+        with self._lock:
+            with self._conn:
+                alert_id = self._conn.execute("INSERT INTO pending_alerts (payload) VALUES (?)",
+                                              (json.dumps(payload),)).lastrowid
+            if self._overflow:
+                return alert_id
+            try:
+                self._queue.put_nowait((alert_id, payload))
+                self._last_queued_id = alert_id
+            except queue.Full:
+                self._overflow = True
+                logging.warning("⚠️ Alert queue is full. New alerts wait in pending_alerts.")
+        return alert_id
+
+    def pending(self):
+        """Number of alerts not yet delivered (queued or waiting in the table)."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_alerts").fetchone()[0]
+
+    def close(self, timeout=10.0):
+        """Gives the worker up to `timeout` seconds to drain, then closes; leftovers stay persisted.
+
+        A shared dispatcher only stops once its last user has closed it.
+        """
+        with _shared_lock:
+            self._users -= 1
+            if self._users > 0:
+                return
+            if self._key is not None and _shared.get(self._key) is self:
+                del _shared[self._key]
+        self._deadline = time.monotonic() + timeout
+        self._stop.set()
+        # Waits cut short by the deadline end the loop; an in-flight post is bounded by its own timeout
+        self._worker.join(timeout + self.timeout + 5.0)
+        if self._worker.is_alive():
+            logging.warning("⚠️ Alert worker did not stop in time. Undelivered alerts stay in pending_alerts.")
+            return
+        with self._lock:
+            left = self._conn.execute("SELECT COUNT(*) FROM pending_alerts").fetchone()[0]
+            self._conn.close()
+        if left:
+            logging.warning(f"⚠️ {left} alert(s) not delivered yet. They will be retried on the next run.")
+
+    def _reload_pending(self):
+        """Queues persisted alerts newer than the last queued one, oldest first, while there is room.
+
+        Returns how many were queued.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, payload FROM pending_alerts WHERE id > ? ORDER BY id LIMIT ?",
+                (self._last_queued_id, self._queue.maxsize - self._queue.qsize() or 1)
+            ).fetchall()
+            queued = 0
+            for alert_id, payload in rows:
+                try:
+                    self._queue.put_nowait((alert_id, json.loads(payload)))
+                except queue.Full:
+                    break
+                self._last_queued_id = alert_id
+                queued += 1
+            newer = self._conn.execute("SELECT 1 FROM pending_alerts WHERE id > ? LIMIT 1",
+                                       (self._last_queued_id,)).fetchone()
+            self._overflow = newer is not None
+        return queued
+
+    def _expired(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _sleep(self, seconds):
+        """Waits up to `seconds`, cut short by the close() deadline. Returns False once it has passed."""
+        if self._deadline is not None:
+            seconds = min(seconds, self._deadline - time.monotonic())
+        if seconds > 0:
+            time.sleep(seconds)
+        return not self._expired()
+
+    def _run(self):
+        while not self._expired():
+            try:
+                if self._overflow and self._queue.empty():
+                    self._reload_pending()
+                try:
+                    first = self._queue.get(timeout=0.2)
+                except queue.Empty:
+                    if self._stop.is_set() and not self._overflow:
+                        return
+                    continue
+                for ids, payload in self._coalesce(first):
+                    self._deliver(ids, payload)
+            except Exception as e:
+                # Keep the worker alive; the alerts involved stay in pending_alerts for the next run
+                logging.error(f"❌ Alert dispatcher error: {e}")
+                self._sleep(1.0)
+
+    def _coalesce(self, first):
+        """Collects the alerts that arrive within the coalescing window and groups them into messages."""
+        items = [first]
+        window_ends = time.monotonic() + self.coalesce_window
+        while sum(len(p.get('embeds', [])) for _, p in items) < MAX_EMBEDS:
+            remaining = window_ends - time.monotonic()
+            try:
+                items.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+
+        messages, ids, embeds = [], [], []
+        for alert_id, payload in items:
+            # Plain-text messages and oversized embed lists go out on their own, in arrival order
+            alone = 'content' in payload or len(payload.get('embeds', [])) > MAX_EMBEDS
+            if ids and (alone or len(embeds) + len(payload['embeds']) > MAX_EMBEDS):
+                messages.append((ids, {'embeds': embeds}))
+                ids, embeds = [], []
+            if alone:
+                messages.append(([alert_id], payload))
+                continue
+            ids.append(alert_id)
+            embeds.extend(payload['embeds'])
+        if ids:
+            messages.append((ids, {'embeds': embeds}))
+        return messages
+
+    def _deliver(self, ids, payload):
+        """Posts one message until Discord accepts or rejects it, or its retries run out."""
+        attempt = 0
+        while True:
+            if not self._sleep(self._send_after - time.monotonic()):
+                return
+            try:
+                response = self.session.post(self.webhook_url, json=payload, timeout=(3.05, self.timeout))
+            except Exception as e:
+                response, error = None, e
+            else:
+                error = None
+                self._track_bucket(response)
+                if response.status_code == 429:
+                    retry_after = self._retry_after(response)
+                    logging.warning(f"⏳ Discord rate limit hit. Retrying in {retry_after:.1f}s.")
+                    self._send_after = time.monotonic() + retry_after
+                    continue
+                if response.status_code < 400:
+                    self._forget(ids)
+                    logging.info(f"✅ Delivered alert message ({len(ids)} alert(s)).")
+                    return
+                if response.status_code < 500:
+                    self._forget(ids)
+                    logging.error(f"❌ Discord rejected alert ({response.status_code}): {response.text[:200]}")
+                    return
+                error = f"HTTP {response.status_code}"
+
+            attempt += 1
+            self._record_attempt(ids)
+            if attempt >= self.max_attempts:
+                self._forget(ids)
+                logging.error(f"❌ Dropping alert after {attempt} failed attempts: {error}")
+                return
+            backoff = min(self.max_backoff, 2 ** (attempt - 1))
+            logging.warning(f"⚠️ Alert delivery failed ({error}). Retrying in {backoff:.0f}s.")
+            if not self._sleep(backoff):
+                return
+
+    def _track_bucket(self, response):
+        """Pauses before the next post when the X-RateLimit bucket has no requests left."""
+        headers = response.headers
+        if headers.get('X-RateLimit-Remaining') == '0':
+            reset_after = float(headers.get('X-RateLimit-Reset-After', 1.0))
+            self._send_after = max(self._send_after, time.monotonic() + reset_after)
+
+    @staticmethod
+    def _retry_after(response):
+        try:
+            return float(response.json().get('retry_after'))
+        except Exception:
+            return float(response.headers.get('Retry-After', 1.0))
+
+    def _forget(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM pending_alerts WHERE id = ?", [(i,) for i in ids])
+
+    def _record_attempt(self, ids):
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE pending_alerts SET attempts = attempts + 1 WHERE id = ?",
+                                   [(i,) for i in ids])
@@ -1,24 +1,143 @@
-import sqlite3
 import pandas as pd
-import ccxt
 import os
 import time
 import logging
+import argparse
+import itertools
+import numpy as np
+from multiprocessing import Pool, shared_memory
+from candle_store import CandleStore, timeframe_to_ms
+from candle_archive import CandleArchive
+from retention import open_history
+from database_manager import OPEN_STATUS, CLOSED_STATUSES
+from candles import CandleArray
+from data_collection import create_exchange, fetch_ohlcv_range
+from outcome_engine import evaluate_outcomes
+from ai_regime import regime_series
 
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
+HORIZON_CANDLES = 48  # Hours of 1h data a signal has to hit TP or SL
+
+# Strategy constants as used live (main.py, ai_regime.py); a sweep grid overrides any of them.
+# sl_pct/tp_pct (percent, e.g. monitor.py's 1.5/3.0) replace the ATR levels when set.
+SWEEP_DEFAULTS = {
+    'sma_length': 20,
+    'adx_threshold': 25.0,
+    'sl_atr': 1.5,
+    'tp_atr': 3.0,
+    'sl_pct': None,
+    'tp_pct': None,
+    'horizon': HORIZON_CANDLES,
+}
+REGIME_TIMEFRAMES = ('1h', '4h', '1d')
+SWEEP_FIELDS = ('timestamp', 'open', 'high', 'low', 'close', 'volume', 'atr', 'adx')
+
+
+def expand_grid(grid):
+    """Every combination of a {param: [values]} grid, each filled in with SWEEP_DEFAULTS."""
+    unknown = set(grid) - set(SWEEP_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    keys = list(grid)
+    return [{**SWEEP_DEFAULTS, **dict(zip(keys, values))}
+            for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def max_drawdown(r_multiples):
+    """Largest peak-to-trough fall (in R) of the cumulative R curve, starting from zero."""
+    if len(r_multiples) == 0:
+        return 0.0
+    equity = np.concatenate(([0.0], np.cumsum(r_multiples)))
+    return float((np.maximum.accumulate(equity) - equity).max())
+
+
+_SWEEP = {}  # Per-process view of the shared candle block, set by _sweep_init
+
+
+def _sweep_init(shm_name, shape, slices, same_bar):
+    """Pool initializer: attaches the shared block and keeps zero-copy per-symbol views."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _SWEEP.update(shm=shm, same_bar=same_bar, regimes={}, symbols=[
+        (symbol, block[:, start:end], block[0, start:end].astype(np.int64)) for symbol, start, end in slices
+    ])
+
+
+def _sweep_regimes(index, length):
+    """Triple-timeframe BULLISH alignment for one symbol, cached per SMA length in the worker."""
+    key = (index, length)
+    if key not in _SWEEP['regimes']:
+        _, data, timestamps = _SWEEP['symbols'][index]
+        closes = data[4]
+        aligned = np.ones(len(closes), dtype=bool)
+        for timeframe in REGIME_TIMEFRAMES:
+            aligned &= regime_series(timestamps, closes, timeframe, length) == 'BULLISH'
+        _SWEEP['regimes'][key] = aligned
+    return _SWEEP['regimes'][key]
+
+
+def _sweep_eval(params):
+    """Replays the ELITE rule for one parameter set over every symbol and grades it."""
+    step = timeframe_to_ms('1h')
+    times, outcomes, r_multiples = [], [], []
+    for index, (_, data, timestamps) in enumerate(_SWEEP['symbols']):
+        _, _, highs, lows, closes, _, atr, adx = data
+        signal = _sweep_regimes(index, int(params['sma_length'])) & (adx > params['adx_threshold'])
+        bars = np.flatnonzero(signal & np.isfinite(atr))
+        entries = closes[bars]
+        if params['sl_pct'] is not None and params['tp_pct'] is not None:
+            sls = entries * (1 - params['sl_pct'] / 100.0)
+            tps = entries * (1 + params['tp_pct'] / 100.0)
+        else:
+            sls = entries - params['sl_atr'] * atr[bars]
+            tps = entries + params['tp_atr'] * atr[bars]
+        # The signal is taken on the bar's close, so grading starts with the next candle
+        graded = evaluate_outcomes(timestamps, highs, lows, closes, timestamps[bars] + step,
+                                   np.ones(len(bars), dtype=bool), entries, tps, sls,
+                                   horizon=int(params['horizon']), same_bar=_SWEEP['same_bar'])
+        times.append(timestamps[bars])
+        outcomes.append(graded['outcome'])
+        r_multiples.append(graded['r_multiple'])
+
+    order = np.argsort(np.concatenate(times), kind='stable')
+    outcomes = np.concatenate(outcomes)[order] if outcomes else np.array([], dtype=object)
+    r = np.concatenate(r_multiples)[order] if r_multiples else np.array([])
+    r = r[~np.isnan(r)]
+    wins, losses = int((outcomes == 'WIN').sum()), int((outcomes == 'LOSS').sum())
+    return {
+        **params,
+        'signals': len(outcomes),
+        'wins': wins,
+        'losses': losses,
+        'expired': int((outcomes == 'EXPIRED').sum()),
+        'win_rate': wins / (wins + losses) * 100 if wins + losses else 0.0,
+        'expectancy': float(r.mean()) if len(r) else float('nan'),
+        'total_r': float(r.sum()),
+        'max_drawdown': max_drawdown(r),
+    }
+
+
 class Backtester:
-    def __init__(self, db_path="signals.db"):
+    def __init__(self, db_path="signals.db", candle_db_path=None, same_bar='TP', archive_dir=None,
+                 signal_archive_dir='signal_archive'):
         self.db_path = db_path
-        self.exchange = ccxt.gateio()
+        self.signal_archive_dir = signal_archive_dir
+        self.same_bar = same_bar
+        self.exchange = create_exchange('gateio')
+        self.store = CandleStore(candle_db_path) if candle_db_path else None
+        self.archive = CandleArchive(archive_dir) if archive_dir else None
 
     def run_test(self):
         try:
-            # 1. Load data from DB
-            conn = sqlite3.connect(self.db_path)
-            # Only test signals that were "Aligned" (High Quality)
-            query = "SELECT * FROM signals WHERE is_aligned = 1"
-            df_signals = pd.read_sql_query(query, conn)
+            # 1. Load data from DB, including the months retention.py moved to the signal archive
+            conn = open_history(self.db_path, self.signal_archive_dir)
+            # Only test signals that were "Aligned" (High Quality) and actually traded: aligned
+            # setups rejected on ADX carry no SL/TP
+            traded = (OPEN_STATUS,) + CLOSED_STATUSES
+            query = (f"SELECT * FROM all_signals WHERE is_aligned = 1 "
+                     f"AND status IN ({', '.join('?' for _ in traded)})")
+            df_signals = pd.read_sql_query(query, conn, params=traded)
             conn.close()
 
             if df_signals.empty:
@@ -26,20 +145,78 @@ class Backtester:
                 return
 
             print(f"📈 Testing {len(df_signals)} historical signals...")
-            
-            results = []
-            for _, signal in df_signals.iterrows():
-                result = self._evaluate_signal(signal)
-                results.append(result)
-                time.sleep(0.2) # Rate limit protection
+            df_signals['ts_ms'] = pd.to_datetime(df_signals['timestamp']).dt.as_unit('ms').astype('int64')
+
+            # One continuous 1h range per symbol; all of its signals are graded in one vectorized pass
+            results, r_multiples = [], []
+            horizon_ms = HORIZON_CANDLES * timeframe_to_ms('1h')
+            for symbol, group in df_signals.groupby('symbol'):
+                candles = self._fetch_range(symbol, group['ts_ms'].min(), group['ts_ms'].max() + horizon_ms)
+                outcomes = self._evaluate_batch(group, candles)
+                results.extend(outcomes['outcome'])
+                r_multiples.extend(outcomes['r_multiple'])
 
             # 2. Calculate Stats
-            self._print_report(results)
+            self._print_report(results, r_multiples)
 
         except Exception as e:
             print(f"❌ Backtest Error: {e}")
 
-    def _evaluate_signal(self, signal):
+    def _fetch_range(self, symbol, since, until):
+        """Returns 1h candles covering [since, until], served locally when they are already stored.
+
+        The memory-mapped archive is tried first and answers with a zero-copy CandleArray view,
+        then the candle store, then the exchange. Whatever is fetched or read from the store is
+        appended to the archive, so it grows forward from the oldest range requested.
+        """
+        step = timeframe_to_ms('1h')
+        since = int(since) // step * step
+        until = min(int(until), int(time.time() * 1000))
+        exchange_id = self.exchange.id
+
+        if self.archive and self.archive.covers(exchange_id, symbol, '1h', since, until, step):
+            return self.archive.load(exchange_id, symbol, '1h', since=since, until=until)
+
+        if self.store:
+            cached = self.store.load(exchange_id, symbol, '1h', since=since, until=until)
+            # Delta fetches leave gaps after downtime: the window must hold every bar, not just the ends
+            if (cached and cached[0][0] == since and cached[-1][0] >= until - step
+                    and (cached[-1][0] - since) // step + 1 == len(cached)):
+                self._archive(symbol, cached)
+                return cached
+
+        try:
+            candles = fetch_ohlcv_range(self.exchange, symbol, '1h', since, until)
+        except Exception as e:
+            logging.error(f"❌ Range fetch failed for {symbol}: {e}")
+            return []
+        if self.store:
+            self.store.upsert(exchange_id, symbol, '1h', candles)
+        self._archive(symbol, candles)
+        return candles
+
+    def _archive(self, symbol, candles):
+        if self.archive:
+            self.archive.append(self.exchange.id, symbol, '1h', candles)
+
+    def _evaluate_batch(self, signals, candles):
+        """Grades a DataFrame of signals against one candle range with the NumPy first-touch engine."""
+        arr = CandleArray.from_ohlcv(candles)
+        tp = signals['take_profit'].to_numpy(dtype=np.float64)
+        sl = signals['stop_loss'].to_numpy(dtype=np.float64)
+        outcomes = evaluate_outcomes(
+            arr.timestamps, arr.high, arr.low, arr.close,
+            signals['ts_ms'].to_numpy(), signals['regime_1h'].to_numpy(), signals['price'].to_numpy(),
+            tp, sl, horizon=HORIZON_CANDLES, same_bar=self.same_bar
+        )
+        # Rows written before SL/TP were stored, or with the 0/0 placeholder rejected rows
+        # used to get, cannot be graded
+        missing = np.isnan(tp) | np.isnan(sl) | (tp <= 0) | (sl <= 0)
+        outcomes['outcome'][missing] = 'ERROR'
+        outcomes['r_multiple'][missing] = np.nan
+        return outcomes
+
+    def _evaluate_signal(self, signal, candles=None):
         symbol = signal['symbol']
         entry_price = signal['price']
         tp = signal['take_profit']
@@ -47,13 +224,13 @@ class Backtester:
         timestamp = signal['timestamp']
         direction = signal['regime_1h']
 
-        # Convert timestamp to milliseconds for CCXT
-        since = int(pd.to_datetime(timestamp).timestamp() * 1000)
-        
         try:
-            # Fetch subsequent 48 hours of 1h data to see outcome
-            candles = self.exchange.fetch_ohlcv(symbol, timeframe='1h', since=since, limit=48)
-            
+            if candles is None:
+                # Convert timestamp to milliseconds for CCXT
+                since = int(pd.to_datetime(timestamp).timestamp() * 1000)
+                # Fetch subsequent 48 hours of 1h data to see outcome
+                candles = self.exchange.fetch_ohlcv(symbol, timeframe='1h', since=since, limit=HORIZON_CANDLES)
+
             for candle in candles:
                 high = candle[2]
                 low = candle[3]
@@ -69,13 +246,94 @@ class Backtester:
         except:
             return "ERROR"
 
-    def _print_report(self, results):
+    def sweep(self, grid, symbols, days=180, processes=None):
+        """Backtests every combination of `grid` (see SWEEP_DEFAULTS) over `days` of 1h history.
+
+        Each combination replays the live ELITE rule on every closed 1h bar of every symbol:
+        1h/4h/1d closes above their SMA and ADX above the threshold, with ATR (or percentage)
+        SL/TP levels graded by the first-touch engine. ATR and ADX are computed once per symbol
+        over the whole history, so early bars differ slightly from a live 100-candle window.
+
+        Candles and indicators are packed into one shared-memory block that the `processes`
+        workers map without copying. Returns one row per combination, ranked by expectancy
+        (then win rate).
+        """
+        from technical_analysis import TechnicalAnalysis
+
+        combos = sorted(expand_grid(grid), key=lambda p: p['sma_length'])  # Workers reuse regimes per length
+        until = int(time.time() * 1000)
+        since = until - days * 24 * timeframe_to_ms('1h')
+        analyzer = TechnicalAnalysis()
+
+        columns, slices, offset = [], [], 0
+        for symbol in symbols:
+            candles = CandleArray.from_ohlcv(self._fetch_range(symbol, since, until))
+            if len(candles) < 2 * HORIZON_CANDLES:
+                logging.warning(f"⚠️ Skipping {symbol}: only {len(candles)} 1h candles.")
+                continue
+            df = analyzer.calculate_indicators(candles.to_frame())
+            if df is None:
+                continue
+            columns.append(np.vstack([candles.data, df[['atr', 'adx']].to_numpy(dtype=np.float64).T]))
+            slices.append((symbol, offset, offset + len(candles)))
+            offset += len(candles)
+        if not slices:
+            print("🚫 No candle history to sweep.")
+            return []
+
+        block = np.hstack(columns)
+        shm = shared_memory.SharedMemory(create=True, size=block.nbytes)
+        try:
+            np.ndarray(block.shape, dtype=np.float64, buffer=shm.buf)[:] = block
+            init_args = (shm.name, block.shape, slices, self.same_bar)
+            del block, columns
+            processes = max(1, min(processes or os.cpu_count() or 1, len(combos)))
+            print(f"🧪 Sweeping {len(combos)} combinations over {len(slices)} symbols "
+                  f"({offset} candles) on {processes} process(es)...")
+            started = time.perf_counter()
+            if processes == 1:
+                _sweep_init(*init_args)
+                try:
+                    rows = [_sweep_eval(params) for params in combos]
+                finally:
+                    _SWEEP.pop('shm').close()
+                    _SWEEP.clear()
+            else:
+                with Pool(processes, initializer=_sweep_init, initargs=init_args) as pool:
+                    rows = pool.map(_sweep_eval, combos, chunksize=max(1, len(combos) // (processes * 4)))
+            print(f"⏱️ Sweep finished in {time.perf_counter() - started:.1f}s.")
+        finally:
+            shm.close()
+            shm.unlink()
+
+        rows.sort(key=lambda row: (-np.nan_to_num(row['expectancy'], nan=-np.inf), -row['win_rate']))
+        return rows
+
+    @staticmethod
+    def print_sweep(rows, top=20):
+        """Prints the best `top` sweep rows as a ranked table."""
+        varied = ([key for key in SWEEP_DEFAULTS if len({row[key] for row in rows}) > 1]
+                  or [key for key in SWEEP_DEFAULTS if rows and rows[0][key] != SWEEP_DEFAULTS[key]]
+                  or ['sma_length'])
+        header = " ".join(f"{key:>13}" for key in varied)
+        print("\n" + "=" * 30)
+        print("🏆 PARAMETER SWEEP RANKING")
+        print("=" * 30)
+        print(f"{'#':>4} {header} {'signals':>8} {'win%':>7} {'exp(R)':>8} {'total(R)':>9} {'maxDD(R)':>9}")
+        for rank, row in enumerate(rows[:top], 1):
+            values = " ".join(f"{str(row[key]):>13}" for key in varied)
+            print(f"{rank:>4} {values} {row['signals']:>8} {row['win_rate']:>6.1f}% "
+                  f"{row['expectancy']:>+8.3f} {row['total_r']:>+9.1f} {row['max_drawdown']:>9.1f}")
+        print("=" * 30)
+
+    def _print_report(self, results, r_multiples=None):
         wins = results.count("WIN")
         losses = results.count("LOSS")
         expired = results.count("EXPIRED")
         total = wins + losses
         
         win_rate = (wins / total * 100) if total > 0 else 0
+        graded = [r for r in (r_multiples or []) if not np.isnan(r)]
         
         print("\n" + "="*30)
         print("📊 BACKTEST PERFORMANCE REPORT")
@@ -85,8 +343,38 @@ class Backtester:
         print(f"Losses:         {losses}")
         print(f"Expired/Open:   {expired}")
         print(f"Win Rate:       {win_rate:.2f}%")
+        if graded:
+            print(f"Expectancy:     {np.mean(graded):+.2f}R")
         print("="*30)
 
+def parse_grid(specs):
+    """['adx_threshold=20,25,30', ...] -> {'adx_threshold': [20.0, 25.0, 30.0], ...}"""
+    grid = {}
+    for spec in specs:
+        key, _, values = spec.partition('=')
+        cast = int if key in ('sma_length', 'horizon') else float
+        grid[key.strip()] = [cast(value) for value in values.split(',') if value.strip()]
+    return grid
+
+
 if __name__ == "__main__":
-    tester = Backtester()
-    tester.run_test()
+    parser = argparse.ArgumentParser(description="Grades stored signals, or sweeps strategy parameters.")
+    parser.add_argument('--sweep', action='append', metavar='PARAM=V1,V2,...',
+                        help=f"Sweep a parameter (repeatable): {', '.join(SWEEP_DEFAULTS)}")
+    parser.add_argument('--symbols', help="Comma-separated symbols to sweep (default: the scanner's list)")
+    parser.add_argument('--days', type=int, default=180, help="Days of 1h history to sweep over")
+    parser.add_argument('--processes', type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument('--top', type=int, default=20, help="Rows of the ranking to print")
+    args = parser.parse_args()
+
+    tester = Backtester(os.getenv('DB_PATH', 'signals.db'), os.getenv('CANDLE_DB_PATH', 'candles.db'),
+                        archive_dir=os.getenv('CANDLE_ARCHIVE_DIR'),
+                        signal_archive_dir=os.getenv('SIGNAL_ARCHIVE_DIR', 'signal_archive'))
+    if args.sweep:
+        if args.symbols:
+            symbols = [symbol.strip() for symbol in args.symbols.split(',')]
+        else:
+            from main import SYMBOLS as symbols
+        tester.print_sweep(tester.sweep(parse_grid(args.sweep), symbols, args.days, args.processes), args.top)
+    else:
+        tester.run_test()
@@ -0,0 +1,98 @@
+import os
+import json
+import logging
+from candle_store import timeframe_to_ms
+from candles import CandleArray
+from ai_regime import SMA_LENGTH
+
+
+def last_closed_open(timeframe, now_ms):
+    """Open time (ms) of the newest `timeframe` candle that has fully closed at `now_ms`."""
+    step = timeframe_to_ms(timeframe)
+    return (int(now_ms) // step - 1) * step
+
+
+class BarCache:
+    def __init__(self, path=None, timeframes=('4h', '1d'), max_entries=10_000):
+        """Memoizes the closed-candle part of each (symbol, timeframe) regime until its next candle closes.
+
+        detect_regime compares the forming bar's close with the SMA of the last SMA_LENGTH
+        closes, i.e. the sum of SMA_LENGTH - 1 closed closes plus the forming close. Only that
+        sum changes on a close, so an entry keeps it (keyed by the open time of the last closed
+        candle) and regime() finishes the rule with the current price, which is the forming
+        bar's close on every timeframe. Cached and freshly fetched timeframes therefore get the
+        same regime. Entries can be persisted as JSON between runs.
+        """
+        self.path = path
+        self.timeframes = tuple(timeframes)
+        self.max_entries = max_entries
+        self.entries = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def lookup(self, symbol, timeframe, now_ms):
+        """The cached entry if it was computed from the last closed candle, otherwise None."""
+        if timeframe not in self.timeframes:
+            return None
+        entry = self.entries.get(f"{symbol}|{timeframe}")
+        if entry and entry['closed_ts'] == last_closed_open(timeframe, now_ms):
+            return entry
+        return None
+
+    def valid(self, symbol, now_ms):
+        """The cached timeframes of a symbol whose entry is still current (no fetch needed)."""
+        return [timeframe for timeframe in self.timeframes if self.lookup(symbol, timeframe, now_ms)]
+
+    def regime(self, symbol, timeframe, price, now_ms):
+        """detect_regime of the cached closed candles plus a forming bar closing at `price`."""
+        entry = self.lookup(symbol, timeframe, now_ms)
+        if entry is None or entry['closed_count'] < SMA_LENGTH - 1:
+            return "UNKNOWN"
+        return "BULLISH" if price > (entry['closed_sum'] + price) / SMA_LENGTH else "BEARISH"
+
+    def closed(self, candles, timeframe, now_ms):
+        """Drops a still-forming last candle from a CandleArray."""
+        if len(candles) and candles.data[0, -1] + timeframe_to_ms(timeframe) > now_ms:
+            return CandleArray(candles.data[:, :-1])
+        return candles
+
+    def store(self, symbol, timeframe, candles, now_ms):
+        """Keeps the closed-candle sum detect_regime needs from a freshly fetched CandleArray."""
+        closed = self.closed(candles, timeframe, now_ms)
+        if not len(closed):
+            return
+        closes = closed.close[-(SMA_LENGTH - 1):]
+        self.entries[f"{symbol}|{timeframe}"] = {
+            'closed_ts': int(closed.data[0, -1]),
+            'closed_sum': float(closes.sum()),
+            'closed_count': len(closes),
+        }
+
+    def evict(self, now_ms):
+        """Drops entries a newer closed candle has superseded, then the oldest beyond max_entries."""
+        self.entries = {
+            key: entry for key, entry in self.entries.items()
+            if entry['closed_ts'] >= last_closed_open(key.rsplit('|', 1)[1], now_ms)
+        }
+        if len(self.entries) > self.max_entries:
+            newest = sorted(self.entries.items(), key=lambda item: item[1]['closed_ts'], reverse=True)
+            self.entries = dict(newest[:self.max_entries])
+
+    def save(self, path=None):
+        """Writes the entries to a JSON file so the next run can reuse them."""
+        path = path or self.path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Restores entries written by save(); a corrupt file starts the cache empty."""
+        path = path or self.path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                # Entries written before the cache kept closed sums are recomputed on the next scan
+                self.entries = {key: entry for key, entry in json.load(f).items() if 'closed_sum' in entry}
+        except Exception as e:
+            logging.error(f"❌ Failed to restore bar cache from {path}: {e}")
+            self.entries = {}
@@ -0,0 +1,483 @@
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from candle_store import timeframe_to_ms
+from candles import CandleArray
+from technical_analysis import TechnicalAnalysis
+from ai_regime import AIRegimeDetector
+from signal_logic import SignalLogic
+from risk_management import RiskManagement
+from backtester import Backtester, HORIZON_CANDLES
+from outcome_engine import evaluate_outcomes
+from database_manager import DatabaseManager
+from data_collection import DataCollector
+from venues import MultiVenueSource
+
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+START_MS = 1_577_836_800_000  # 2020-01-01 00:00 UTC, aligned to every timeframe up to 1d
+DEFAULT_BASELINE = 'benchmark_baseline.json'
+# pandas_ta_openbb 0.4.23 output (what the workflows ran before calculate_indicators dropped it)
+INDICATOR_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicator_fixture.json')
+INDICATOR_COLUMNS = ('rsi', 'adx', 'atr', 'ema_20', 'ema_50')
+
+# Every scale is generated from fixed seeds, so two runs always see identical data
+SCALES = {
+    'small': {'symbols': 8, 'bars': 100, 'repeat': 5},
+    'large': {'symbols': 500, 'bars': 10_000, 'repeat': 1},
+    'signals': {'signals': 1_000_000, 'bars': 50_000, 'loop_sample': 20_000, 'repeat': 1},
+}
+
+
+def synthetic_ohlcv(bars, seed=0, timeframe='1h', price=100.0):
+    """Deterministic ccxt-style [ts, o, h, l, c, v] candles: a random walk with slow trend swings."""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, bars) + 0.002 * np.sin(np.arange(bars) / 200 + seed)
+    close = price * np.exp(np.cumsum(returns))
+    open_ = np.concatenate(([price], close[:-1]))
+    wick = np.abs(rng.normal(0, 0.005, bars)) * close
+    high = np.maximum(open_, close) + wick
+    low = np.minimum(open_, close) - wick
+    volume = rng.lognormal(10, 1, bars)
+    times = START_MS + np.arange(bars, dtype=np.int64) * timeframe_to_ms(timeframe)
+    return [[int(t), o, h, l, c, v] for t, o, h, l, c, v in
+            zip(times, open_.tolist(), high.tolist(), low.tolist(), close.tolist(), volume.tolist())]
+
+
+def synthetic_frame(bars, seed=0):
+    return pd.DataFrame(synthetic_ohlcv(bars, seed), columns=COLUMNS)
+
+
+def synthetic_signals(candles, count, seed=0):
+    """Signals at random candle opens with ±1.5% SL / ±3% TP, half BULLISH and half BEARISH."""
+    rng = np.random.default_rng(seed)
+    arr = np.asarray(candles, dtype=np.float64)
+    idx = rng.integers(0, len(arr) - HORIZON_CANDLES, count)
+    bullish = rng.random(count) < 0.5
+    entries = arr[idx, 4]
+    sign = np.where(bullish, 1.0, -1.0)
+    return {
+        'index': idx,
+        'entry_times': arr[idx, 0].astype(np.int64) + 1,  # just after the open, so grading starts on the next bar
+        'directions': np.where(bullish, 'BULLISH', 'BEARISH'),
+        'entries': entries,
+        'tps': entries * (1 + 0.03 * sign),
+        'sls': entries * (1 - 0.015 * sign),
+    }
+
+
+def with_signal_columns(df):
+    """Adds the pandas-ta style columns SignalLogic reads (ISA_9, RSI_14, Bollinger bands)."""
+    df = df.copy()
+    df['RSI_14'] = df['rsi']
+    df['ISA_9'] = (df['high'].rolling(9).max() + df['low'].rolling(9).min()) / 2
+    mid, std = df['close'].rolling(20).mean(), df['close'].rolling(20).std()
+    df['BBU_20_2.0'] = mid + 2 * std
+    df['BBL_20_2.0'] = mid - 2 * std
+    return df
+
+
+def peak_memory(func, args):
+    """tracemalloc peak (bytes) allocated by a single call, above what was live before it."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+
+
+def measure(func, calls, repeat=1, memory=True, memory_calls=5):
+    """Times func over every argument tuple from calls() (best of `repeat` passes).
+
+    Only the calls themselves are timed; building their inputs is not. Peak memory is the
+    largest single-call peak over the first `memory_calls` calls, measured in a separate
+    pass so tracing overhead never leaks into the timings.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        elapsed = 0.0
+        for args in calls():
+            started = time.perf_counter()
+            func(*args)
+            elapsed += time.perf_counter() - started
+        best = min(best, elapsed)
+
+    peak = None
+    if memory:
+        peak = max((peak_memory(func, args) for _, args in zip(range(memory_calls), calls())), default=0)
+    return best, peak
+
+
+def run_analysis_scale(name, scale, memory, memory_calls=5):
+    """Per-symbol scanner hot paths on independent series of 1h candles.
+
+    Symbols are the outer loop so only one analyzed frame is alive at a time, and every
+    downstream case reuses the indicator output of the same symbol.
+    """
+    symbols, bars = scale['symbols'], scale['bars']
+    analyzer = TechnicalAnalysis()
+    ai_bot = AIRegimeDetector()
+    cases = {
+        'TechnicalAnalysis.calculate_indicators': (analyzer.calculate_indicators, lambda seed, raw, df: (raw.copy(),)),
+        'TechnicalAnalysis.latest_indicators': (analyzer.latest_indicators, lambda seed, raw, df: (
+            CandleArray.from_frame(raw),)),
+        'AIRegimeDetector.detect_regime': (ai_bot.detect_regime, lambda seed, raw, df: (df,)),
+        'SignalLogic.generate_signal': (SignalLogic.generate_signal, lambda seed, raw, df: (
+            f"SYM{seed}/USDT", dict.fromkeys(['1h', '4h', '1d'], with_signal_columns(df)),
+            'Trending', 1 if seed % 2 else -1)),
+        'RiskManagement.calculate_sl_tp': (RiskManagement.calculate_sl_tp, lambda seed, raw, df: (
+            df, 'LONG' if seed % 2 else 'SHORT', df['close'].iloc[-1])),
+    }
+    best = dict.fromkeys(cases, float('inf'))
+    peaks = dict.fromkeys(cases, 0)
+
+    for attempt in range(scale['repeat']):
+        totals = dict.fromkeys(cases, 0.0)
+        for seed in range(symbols):
+            raw = synthetic_frame(bars, seed)
+            df = analyzer.calculate_indicators(raw.copy())
+            for case, (func, build_args) in cases.items():
+                args = build_args(seed, raw, df)
+                started = time.perf_counter()
+                func(*args)
+                totals[case] += time.perf_counter() - started
+                if memory and attempt == 0 and seed < memory_calls:
+                    peaks[case] = max(peaks[case], peak_memory(func, build_args(seed, raw, df)))
+        for case, seconds in totals.items():
+            best[case] = min(best[case], seconds)
+
+    return [result_row(name, case, symbols * bars, best[case], peaks[case] if memory else None)
+            for case in cases]
+
+
+def run_signals_scale(name, scale, memory):
+    """Stored-signal paths: batched audit writes, open-position reads and outcome grading."""
+    count, bars = scale['signals'], scale['bars']
+    candles = synthetic_ohlcv(bars, seed=42)
+    sig = synthetic_signals(candles, count, seed=7)
+    arr = np.asarray(candles, dtype=np.float64)
+    results = []
+
+    tmpdir = tempfile.mkdtemp(prefix='bench_')
+    db_path = os.path.join(tmpdir, 'signals.db')
+    row = {'rsi': 55.0, 'adx': 30.0, 'atr': 1.2}
+    regimes = {'1h': 'BULLISH', '4h': 'BULLISH', '1d': 'BULLISH'}
+    statuses = np.where(np.arange(count) % 100 == 0, 'ELITE', 'REJECTED')  # ~1% still open
+
+    def save_all(db):
+        with db.batch():
+            for i in range(count):
+                db.save_signal('BTC/USDT', float(sig['entries'][i]), regimes, row,
+                               float(sig['sls'][i]), float(sig['tps'][i]), True,
+                               statuses[i], '', int(i % 24))
+
+    def fresh_db():
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        db = DatabaseManager(db_path)
+        yield (db,)
+        db.close()
+
+    try:
+        seconds, _ = measure(save_all, fresh_db, scale['repeat'], memory=False)
+        results.append(result_row(name, 'DatabaseManager.save_signal (batched)', count, seconds, None))
+
+        db = DatabaseManager(db_path)
+        seconds, peak = measure(db.get_open_signals, lambda: iter([()]), scale['repeat'], memory)
+        results.append(result_row(name, 'DatabaseManager.get_open_signals', count, seconds, peak))
+        db.close()
+    finally:
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        os.rmdir(tmpdir)
+
+    # The legacy per-signal loop is timed on a sample; its rate is what compares
+    tester = Backtester.__new__(Backtester)  # no exchange client: candles are passed in
+    sample = min(scale['loop_sample'], count)
+
+    def loop_inputs():
+        for i in range(sample):
+            start = sig['index'][i] + 1
+            yield ({'symbol': 'BTC/USDT', 'price': sig['entries'][i], 'take_profit': sig['tps'][i],
+                    'stop_loss': sig['sls'][i], 'timestamp': None, 'regime_1h': sig['directions'][i]},
+                   candles[start:start + HORIZON_CANDLES])
+
+    seconds, peak = measure(tester._evaluate_signal, loop_inputs, scale['repeat'], memory)
+    results.append(result_row(name, 'Backtester._evaluate_signal', sample, seconds, peak))
+
+    grade_args = (arr[:, 0].astype(np.int64), arr[:, 2], arr[:, 3], arr[:, 4], sig['entry_times'],
+                  sig['directions'], sig['entries'], sig['tps'], sig['sls'], HORIZON_CANDLES)
+    seconds, peak = measure(evaluate_outcomes, lambda: iter([grade_args]), scale['repeat'], memory)
+    results.append(result_row(name, 'outcome_engine.evaluate_outcomes', count, seconds, peak))
+    return results
+
+
+def result_row(scale, case, items, seconds, peak):
+    return {
+        'scale': scale, 'case': case, 'items': items, 'seconds': seconds,
+        'per_sec': items / seconds if seconds > 0 else float('inf'),
+        'peak_mb': peak / 1e6 if peak is not None else None,
+    }
+
+
+def environment():
+    """Versions that move the numbers."""
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def check_parity(symbols=8, bars=(15, 60, 500), tolerance=1e-9):
+    """Largest gap between latest_indicators and calculate_indicators().iloc[-1] on the same windows.
+
+    The scanner decides on the streaming fold while replay and the sweep use the DataFrame path,
+    so any gap here can flip the ADX gate between them. Returns {column: max abs difference}
+    of the columns above `tolerance`.
+    """
+    analyzer = TechnicalAnalysis()
+    worst = {}
+    for seed in range(symbols):
+        for count in bars:
+            raw = synthetic_frame(count, seed)
+            frame = analyzer.calculate_indicators(raw.copy()).iloc[-1]
+            folded = analyzer.latest_indicators(CandleArray.from_frame(raw))
+            for column in INDICATOR_COLUMNS:
+                a, b = frame[column], folded[column]
+                gap = 0.0 if np.isnan(a) and np.isnan(b) else abs(a - b)
+                worst[column] = max(worst.get(column, 0.0), gap)
+    return {column: gap for column, gap in worst.items() if not gap <= tolerance}
+
+
+def record_fixture(path=INDICATOR_FIXTURE, symbols=3, bars=120):
+    """Records pandas_ta's RSI/ADX/ATR/EMA columns on synthetic candles as the parity reference.
+
+    Only needed once (pandas_ta must be installed); the candles are stored with the columns,
+    so check_reference does not depend on the random generator.
+    """
+    import importlib.metadata  # pandas_ta reads its version through it without importing it
+    import pandas_ta as ta
+    cases = []
+    for seed in range(symbols):
+        raw = synthetic_frame(bars, seed)
+        high, low, close = raw['high'], raw['low'], raw['close']
+        columns = {
+            'rsi': ta.rsi(close, length=14),
+            'adx': ta.adx(high, low, close, length=14)['ADX_14'],
+            'atr': ta.atr(high, low, close, length=14),
+            'ema_20': ta.ema(close, length=20),
+            'ema_50': ta.ema(close, length=50),
+        }
+        case = {'high': high.tolist(), 'low': low.tolist(), 'close': close.tolist()}
+        for column, values in columns.items():
+            case[column] = [None if np.isnan(v) else v for v in values.tolist()]
+        cases.append(case)
+    with open(path, 'w') as f:
+        json.dump({'meta': {**environment(), 'pandas_ta': ta.version}, 'cases': cases}, f)
+    return len(cases)
+
+
+def check_reference(path=INDICATOR_FIXTURE, tolerance=1e-9):
+    """Largest gap between calculate_indicators and the recorded pandas_ta columns.
+
+    Compares every row, so the warm-up NaNs must line up too. Returns {column: max abs
+    difference} of the columns above `tolerance`.
+    """
+    with open(path) as f:
+        fixture = json.load(f)
+    analyzer = TechnicalAnalysis()
+    worst = {}
+    for case in fixture['cases']:
+        close = case['close']
+        raw = pd.DataFrame({'timestamp': START_MS, 'open': close, 'high': case['high'], 'low': case['low'],
+                            'close': close, 'volume': 0.0})
+        frame = analyzer.calculate_indicators(raw)
+        for column in INDICATOR_COLUMNS:
+            ours = frame[column].to_numpy()
+            reference = np.array(case[column], dtype=np.float64)
+            gaps = np.where(np.isnan(ours) & np.isnan(reference), 0.0, np.abs(ours - reference))
+            worst[column] = max(worst.get(column, 0.0), float(np.nanmax(np.where(np.isnan(gaps), np.inf, gaps))))
+    return {column: gap for column, gap in worst.items() if not gap <= tolerance}
+
+
+class FakeVenue:
+    """ccxt stand-in for check_venues: serves flat 1h candles, or fails / stalls on demand."""
+
+    def __init__(self, name, fail=False, delay=0.0):
+        self.id = name
+        self.rateLimit = 0
+        self.has = {'fetchOHLCV': True}
+        self.fail = fail
+        self.delay = delay
+        self.calls = 0
+
+    def fetch_ohlcv(self, symbol, timeframe='1h', since=None, limit=100, params=None):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.id} is down")
+        step = timeframe_to_ms(timeframe)
+        now = int(time.time() * 1000) // step * step
+        start = -(-since // step) * step if since is not None else now - (limit - 1) * step
+        return [[t, 1.0, 2.0, 0.5, 1.5, 10.0] for t in range(start, now + 1, step)][:limit]
+
+
+def check_venues():
+    """Runs MultiVenueSource against fake exchanges; returns the failed checks (empty when all pass).
+
+    Covers failover from a failing primary, the breaker opening after `failure_threshold`
+    failures and closing after its cool-down, hedging past a stalled primary, and the serving
+    venue being stored with the candles.
+    """
+    failures = []
+    def expect(ok, name):
+        if not ok:
+            failures.append(name)
+
+    primary, backup = FakeVenue('primary', fail=True), FakeVenue('backup')
+    events = []
+    source = MultiVenueSource([primary, backup], failure_threshold=2, cooldown=0.2, on_event=events.append)
+    try:
+        expect(len(source.fetch_ohlcv('BTC/USDT', '1h', limit=5)) == 5 and source.last_venue == 'backup'
+               and 'failover' in events, "failover to the backup venue")
+        source.fetch_ohlcv('BTC/USDT', '1h', limit=5)
+        expect(not source.venues[0].available() and 'breaker_open_primary' in events,
+               "breaker opens after 2 failures")
+        calls = primary.calls
+        source.fetch_ohlcv('BTC/USDT', '1h', limit=5)
+        expect(primary.calls == calls, "open breaker skips the primary")
+        time.sleep(0.25)
+        primary.fail = False
+        source.fetch_ohlcv('BTC/USDT', '1h', limit=5)
+        expect(source.last_venue == 'primary' and source.venues[0].available(),
+               "breaker closes after the cool-down")
+    finally:
+        source.close()
+
+    events = []
+    source = MultiVenueSource([FakeVenue('primary', delay=0.5), FakeVenue('backup')], initial_hedge_delay=0.05,
+                              on_event=events.append)
+    try:
+        source.fetch_ohlcv('BTC/USDT', '1h', limit=5)
+        expect(source.last_venue == 'backup' and 'hedged' in events, "stalled primary is hedged")
+    finally:
+        source.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = DataCollector({'CANDLE_DB_PATH': os.path.join(tmp, 'candles.db')})
+        collector._exchange = MultiVenueSource([FakeVenue('primary', fail=True), FakeVenue('backup')])
+        try:
+            collector.fetch_data('BTC/USDT', '1h', 50)
+            expect(collector.store.venues('primary', 'BTC/USDT', '1h') == {'backup': 50},
+                   "serving venue stored with the candles")
+        finally:
+            collector.close()
+    return failures
+
+
+def print_results(results, baseline=None, tolerance=0.10):
+    """Prints the results table; with a baseline, adds the change and flags regressions."""
+    previous = {(r['scale'], r['case']): r for r in (baseline or {}).get('results', [])}
+    regressions = []
+    print("\n" + "=" * 100)
+    print("🏁 BENCHMARK RESULTS")
+    print("=" * 100)
+    header = f"{'Scale':<8}{'Case':<42}{'Items':>10}{'Time (s)':>10}{'Items/s':>14}{'Peak MB':>9}"
+    print(header + (f"{'vs base':>10}" if baseline else ""))
+    for r in results:
+        peak = f"{r['peak_mb']:.1f}" if r['peak_mb'] is not None else "-"
+        line = f"{r['scale']:<8}{r['case'][:41]:<42}{r['items']:>10}{r['seconds']:>10.3f}{r['per_sec']:>14,.0f}{peak:>9}"
+        old = previous.get((r['scale'], r['case']))
+        if old:
+            change = r['per_sec'] / old['per_sec'] - 1
+            slower = change < -tolerance
+            heavier = (r['peak_mb'] is not None and old.get('peak_mb')
+                       and r['peak_mb'] > old['peak_mb'] * (1 + tolerance))
+            flag = " ⚠️" if slower or heavier else ""
+            line += f"{change:>+10.0%}{flag}"
+            if flag:
+                regressions.append(r)
+        elif baseline:
+            line += f"{'new':>10}"
+        print(line)
+    print("=" * 100)
+    if baseline:
+        meta = baseline.get('meta', {})
+        print(f"Baseline: {meta.get('created', '?')} | numpy {meta.get('numpy', '?')} | pandas {meta.get('pandas', '?')}")
+        if regressions:
+            print(f"⚠️ {len(regressions)} case(s) slower or heavier than baseline by more than {tolerance:.0%}.")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the analysis hot paths.")
+    parser.add_argument('--scale', choices=[*SCALES, 'all'], action='append',
+                        help="Scale(s) to run (default: small). Repeat the flag to combine.")
+    parser.add_argument('--save', nargs='?', const=DEFAULT_BASELINE, help="Write results as a baseline JSON.")
+    parser.add_argument('--compare', nargs='?', const=DEFAULT_BASELINE, help="Compare against a baseline JSON.")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="Allowed slowdown/memory growth (default 0.10).")
+    parser.add_argument('--repeat', type=int, help="Override the best-of-N passes of every scale.")
+    parser.add_argument('--no-memory', action='store_true', help="Skip the tracemalloc pass.")
+    parser.add_argument('--record-fixture', nargs='?', const=INDICATOR_FIXTURE,
+                        help="Record the pandas_ta indicator reference (needs pandas_ta) and exit.")
+    args = parser.parse_args(argv)
+
+    if args.record_fixture:
+        print(f"💾 Recorded {record_fixture(args.record_fixture)} pandas_ta cases to {args.record_fixture}")
+        return 0
+
+    names = args.scale or ['small']
+    if 'all' in names:
+        names = list(SCALES)
+
+    logging.disable(logging.INFO)  # keep per-row INFO logs out of the timings
+    mismatches = check_parity()
+    if mismatches:
+        gaps = ", ".join(f"{column} {gap:.3g}" for column, gap in mismatches.items())
+        print(f"❌ latest_indicators and calculate_indicators disagree: {gaps}")
+    drift = check_reference()
+    if drift:
+        gaps = ", ".join(f"{column} {gap:.3g}" for column, gap in drift.items())
+        print(f"❌ calculate_indicators drifted from the recorded pandas_ta output: {gaps}")
+    venue_failures = check_venues()
+    if venue_failures:
+        print(f"❌ MultiVenueSource checks failed: {', '.join(venue_failures)}")
+    results = []
+    for name in dict.fromkeys(names):
+        scale = dict(SCALES[name])
+        if args.repeat:
+            scale['repeat'] = args.repeat
+        print(f"⏱️ Running '{name}' scale...", flush=True)
+        runner = run_signals_scale if 'signals' in scale else run_analysis_scale
+        results.extend(runner(name, scale, not args.no_memory))
+    logging.disable(logging.NOTSET)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    regressions = print_results(results, baseline, args.tolerance)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({'meta': environment(), 'results': results}, f, indent=2)
+        print(f"💾 Baseline saved to {args.save}")
+    return 1 if regressions or mismatches or drift or venue_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+import os
+import time
+import logging
+import argparse
+import threading
+import numpy as np
+from candles import CandleArray, COLUMNS
+from candle_store import CandleStore
+
+RECORD = np.dtype([(name, '<f8') for name in COLUMNS])  # 48 bytes: [ts, o, h, l, c, v] as float64
+
+
+class CandleArchive:
+    def __init__(self, root='candle_archive'):
+        """Append-only binary candle files, one per (exchange, symbol, timeframe), read through mmap.
+
+        Every file is a flat array of fixed-width RECORDs in ascending timestamp order, so the
+        timestamp column doubles as the index: a range lookup is two binary searches over the
+        mapped file and returns a view, never a copy. Only the pages a backtest touches are read
+        from disk, so resident memory follows the working set rather than the archive size.
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._maps = {}  # path -> (file size, memmap)
+
+    def path(self, exchange_id, symbol, timeframe):
+        return os.path.join(self.root, exchange_id, f"{symbol.replace('/', '_')}_{timeframe}.bin")
+
+    def records(self, exchange_id, symbol, timeframe):
+        """The whole file as a read-only (n x 6) float64 memmap (empty if nothing is archived)."""
+        path = self.path(exchange_id, symbol, timeframe)
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return np.empty((0, len(COLUMNS)))
+        count = size // RECORD.itemsize  # A torn trailing record from an interrupted append is ignored
+        with self._lock:
+            cached = self._maps.get(path)
+            if cached and cached[0] == size:
+                return cached[1]
+            mapped = (np.memmap(path, dtype='<f8', mode='r', shape=(count, len(COLUMNS)))
+                      if count else np.empty((0, len(COLUMNS))))
+            self._maps[path] = (size, mapped)
+        return mapped
+
+    def last_timestamp(self, exchange_id, symbol, timeframe):
+        records = self.records(exchange_id, symbol, timeframe)
+        return int(records[-1, 0]) if len(records) else None
+
+    def append(self, exchange_id, symbol, timeframe, ohlcv):
+        """Appends candles newer than the archive; a re-fetched last bar overwrites the stored one.
+
+        Older candles are ignored, the file only ever grows at the end. Returns the number of
+        new records.
+        """
+        rows = np.asarray(CandleArray.from_ohlcv(ohlcv).data.T, dtype='<f8')
+        if not len(rows):
+            return 0
+        path = self.path(exchange_id, symbol, timeframe)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            self._maps.pop(path, None)
+            with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+                count = f.seek(0, os.SEEK_END) // RECORD.itemsize
+                f.truncate(count * RECORD.itemsize)  # Drop a torn record left by an interrupted append
+                if count:
+                    f.seek((count - 1) * RECORD.itemsize)
+                    last_ts = np.frombuffer(f.read(RECORD.itemsize), dtype='<f8')[0]
+                    same = rows[:, 0] == last_ts
+                    if same.any():
+                        # The stored last bar was fetched again (it was still forming): rewrite it in place
+                        f.seek((count - 1) * RECORD.itemsize)
+                        f.write(rows[same][-1].tobytes())
+                    rows = rows[rows[:, 0] > last_ts]
+                # Keep the file strictly ascending even if the input repeats bars
+                rows = rows[np.r_[True, np.diff(rows[:, 0]) > 0]] if len(rows) else rows
+                f.seek(count * RECORD.itemsize)
+                f.write(np.ascontiguousarray(rows).tobytes())
+        return len(rows)
+
+    def bounds(self, records, since=None, until=None):
+        """[start, end) record indices of the inclusive [since, until] window, by binary search."""
+        timestamps = records[:, 0]
+        start = 0 if since is None else int(np.searchsorted(timestamps, since, side='left'))
+        end = len(records) if until is None else int(np.searchsorted(timestamps, until, side='right'))
+        return start, max(start, end)
+
+    def load(self, exchange_id, symbol, timeframe, since=None, until=None, limit=None):
+        """Candles in [since, until] (newest `limit` of them) as a zero-copy CandleArray view."""
+        records = self.records(exchange_id, symbol, timeframe)
+        start, end = self.bounds(records, since, until)
+        if limit is not None:
+            start = max(start, end - int(limit))
+        return CandleArray(records[start:end].T)
+
+    def covers(self, exchange_id, symbol, timeframe, since, until, step):
+        """True if the archive holds every candle from `since` through the bar that contains `until`.
+
+        append() accepts bars after a gap (e.g. after downtime), so the endpoints alone prove
+        nothing: the window must also hold one record per `step` between them.
+        """
+        records = self.records(exchange_id, symbol, timeframe)
+        start, end = self.bounds(records, since, until)
+        if end == start:
+            return False
+        first, last = records[start, 0], records[end - 1, 0]
+        return first == since and last >= until - step and (last - first) // step + 1 == end - start
+
+    def import_store(self, store, exchange_id, timeframe='1h', symbols=None):
+        """Copies candles from a CandleStore into the archive; returns {symbol: new records}."""
+        if symbols is None:
+            symbols = store.symbols(exchange_id, timeframe)
+        added = {}
+        for symbol in symbols:
+            last = self.last_timestamp(exchange_id, symbol, timeframe)
+            added[symbol] = self.append(exchange_id, symbol, timeframe,
+                                        store.load(exchange_id, symbol, timeframe, since=last))
+        return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memory-mapped candle archive for long backtests.")
+    parser.add_argument('command', choices=['import', 'info'])
+    parser.add_argument('--root', default=os.getenv('CANDLE_ARCHIVE_DIR', 'candle_archive'))
+    parser.add_argument('--candle-db', default=os.getenv('CANDLE_DB_PATH', 'candles.db'))
+    parser.add_argument('--exchange', default='gateio')
+    parser.add_argument('--timeframe', default='1h')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    archive = CandleArchive(args.root)
+    if args.command == 'import':
+        store = CandleStore(args.candle_db)
+        try:
+            started = time.perf_counter()
+            added = archive.import_store(store, args.exchange, args.timeframe)
+        finally:
+            store.close()
+        logging.info(f"📦 Archived {sum(added.values())} new candles for {len(added)} symbols "
+                     f"in {time.perf_counter() - started:.2f}s.")
+        return 0
+
+    directory = os.path.join(args.root, args.exchange)
+    for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+        symbol, _, timeframe = name[:-len('.bin')].rpartition('_')
+        records = archive.records(args.exchange, symbol.replace('_', '/'), timeframe)
+        if len(records):
+            first, last = (time.strftime('%Y-%m-%d %H:%M', time.gmtime(ts / 1000)) for ts in records[[0, -1], 0])
+            print(f"{symbol.replace('_', '/'):<14} {timeframe:>4} {len(records):>10} candles  {first} -> {last}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+
+TIMEFRAME_UNITS = {'m': 60_000, 'h': 3_600_000, 'd': 86_400_000, 'w': 604_800_000}
+
+
+def timeframe_to_ms(timeframe):
+    """Converts a ccxt timeframe string such as '4h' into milliseconds."""
+    return int(timeframe[:-1]) * TIMEFRAME_UNITS[timeframe[-1]]
+
+
+class CandleStore:
+    def __init__(self, db_path='candles.db'):
+        """Opens (or creates) the on-disk OHLCV store shared by the scanner, monitor and backtester."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._init_db()
+
+    def _init_db(self):
+        """Creates the candles table keyed by (exchange, symbol, timeframe, timestamp)."""
+        with self._lock, self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS candles (
+                    exchange TEXT NOT NULL,
+                    symbol TEXT NOT NULL,
+                    timeframe TEXT NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    volume REAL,
+                    venue TEXT,
+                    PRIMARY KEY (exchange, symbol, timeframe, timestamp)
+                ) WITHOUT ROWID
+            ''')
+            # Stores created before hedged fetching lack the serving venue
+            columns = [col[1] for col in self._conn.execute("PRAGMA table_info(candles)")]
+            if 'venue' not in columns:
+                self._conn.execute("ALTER TABLE candles ADD COLUMN venue TEXT")
+
+    def last_timestamp(self, exchange_id, symbol, timeframe):
+        """Returns the open time (ms) of the newest stored candle, or None if nothing is stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(timestamp) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?",
+                (exchange_id, symbol, timeframe)
+            ).fetchone()
+        return row[0] if row else None
+
+    def count(self, exchange_id, symbol, timeframe, since=None, until=None):
+        """Returns how many candles are stored inside the inclusive [since, until] window."""
+        query = "SELECT COUNT(*) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?"
+        params = [exchange_id, symbol, timeframe]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(int(until))
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def upsert(self, exchange_id, symbol, timeframe, ohlcv, venue=None):
+        """Merges candles into the store; a re-fetched bar replaces the (possibly still forming) stored one.
+
+        `venue` records which exchange actually served the candles when `exchange_id` names a
+        multi-venue source (NULL means `exchange_id` itself).
+        """
+        if not ohlcv:
+            return
+        rows = [(exchange_id, symbol, timeframe, int(c[0]), c[1], c[2], c[3], c[4], c[5], venue) for c in ohlcv]
+        with self._lock, self._conn:
+            self._conn.executemany('''
+                INSERT OR REPLACE INTO candles (exchange, symbol, timeframe, timestamp, open, high, low, close, volume, venue)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+
+    def load(self, exchange_id, symbol, timeframe, limit=None, since=None, until=None):
+        """Returns stored candles as [timestamp, open, high, low, close, volume] lists in ascending order.
+
+        With `limit`, only the newest `limit` candles inside the [since, until] window are returned.
+        """
+        query = "SELECT timestamp, open, high, low, close, volume FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?"
+        params = [exchange_id, symbol, timeframe]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(int(until))
+        if limit is not None:
+            query = f"SELECT * FROM ({query} ORDER BY timestamp DESC LIMIT ?) ORDER BY timestamp ASC"
+            params.append(int(limit))
+        else:
+            query += " ORDER BY timestamp ASC"
+
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [list(row) for row in rows]
+
+    def venues(self, exchange_id, symbol, timeframe, since=None, until=None):
+        """Returns {venue: candle count} of the stored candles in the inclusive [since, until] window."""
+        query = "SELECT COALESCE(venue, exchange), COUNT(*) FROM candles WHERE exchange = ? AND symbol = ? AND timeframe = ?"
+        params = [exchange_id, symbol, timeframe]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp <= ?"
+            params.append(int(until))
+        with self._lock:
+            return dict(self._conn.execute(query + " GROUP BY 1", params).fetchall())
+
+    def symbols(self, exchange_id, timeframe):
+        """Returns the symbols that have stored candles for this exchange and timeframe."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT symbol FROM candles WHERE exchange = ? AND timeframe = ? ORDER BY symbol",
+                (exchange_id, timeframe)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self):
+        """Closes the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
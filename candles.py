@@ -0,0 +1,108 @@
+import numpy as np
+from candle_store import timeframe_to_ms
+
+COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+TIMESTAMP, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+class CandleArray:
+    """OHLCV candles in one (6 x n) float64 block, one contiguous row per field.
+
+    The in-process form of a candle series: columns are NumPy views (`candles['close']` or
+    `candles.close`), so the analysis and risk code never build a DataFrame. Timestamps are
+    milliseconds, exact in float64 for any realistic date. Convert with to_frame()/to_ohlcv()
+    only at the edges (pandas_ta, ccxt-shaped consumers, storage).
+    """
+
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data
+
+    @classmethod
+    def from_ohlcv(cls, ohlcv):
+        """Builds the block from ccxt-style [ts, o, h, l, c, v] rows (a CandleArray is returned as is)."""
+        if isinstance(ohlcv, cls):
+            return ohlcv
+        rows = np.asarray(ohlcv, dtype=np.float64).reshape(-1, 6)
+        return cls(np.ascontiguousarray(rows.T))
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls(np.ascontiguousarray(df[list(COLUMNS)].to_numpy(dtype=np.float64).T))
+
+    def __len__(self):
+        return self.data.shape[1]
+
+    def __getitem__(self, column):
+        return self.data[COLUMNS.index(column)]
+
+    @property
+    def timestamps(self):
+        return self.data[TIMESTAMP].astype(np.int64)
+
+    @property
+    def open(self):
+        return self.data[OPEN]
+
+    @property
+    def high(self):
+        return self.data[HIGH]
+
+    @property
+    def low(self):
+        return self.data[LOW]
+
+    @property
+    def close(self):
+        return self.data[CLOSE]
+
+    @property
+    def volume(self):
+        return self.data[VOLUME]
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def tail(self, n):
+        """The newest `n` candles as a view (no copy)."""
+        return CandleArray(self.data[:, max(len(self) - n, 0):]) if n < len(self) else self
+
+    def rows(self):
+        """Iterates candles as [ts, o, h, l, c, v] lists, e.g. for IndicatorState.update."""
+        return iter(self.data.T.tolist())
+
+    def resample(self, timeframe):
+        """Vectorized resample_ohlcv: UTC-epoch buckets, partial leading bucket dropped, forming bar kept."""
+        if not len(self):
+            return self
+        step = timeframe_to_ms(timeframe)
+        ts = self.timestamps
+        buckets = ts // step * step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        data = np.empty((6, len(starts)))
+        data[TIMESTAMP] = buckets[starts]
+        data[OPEN] = self.open[starts]
+        data[HIGH] = np.maximum.reduceat(self.high, starts)
+        data[LOW] = np.minimum.reduceat(self.low, starts)
+        data[CLOSE] = self.close[ends]
+        data[VOLUME] = np.add.reduceat(self.volume, starts)
+        if ts[0] != buckets[0]:
+            data = data[:, 1:]
+        return CandleArray(np.ascontiguousarray(data))
+
+    def to_ohlcv(self):
+        """ccxt-shaped [[ts, o, h, l, c, v], ...] with integer timestamps."""
+        rows = self.data.T.tolist()
+        for row in rows:
+            row[0] = int(row[0])
+        return rows
+
+    def to_frame(self):
+        """A pandas DataFrame with the columns calculate_indicators expects (edge conversion)."""
+        import pandas as pd
+        df = pd.DataFrame(self.data.T.copy(), columns=list(COLUMNS))
+        df['timestamp'] = df['timestamp'].astype(np.int64)
+        return df
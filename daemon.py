@@ -0,0 +1,103 @@
+import os
+import time
+import signal
+import logging
+import threading
+from candle_store import timeframe_to_ms
+from data_collection import DataCollector
+from technical_analysis import TechnicalAnalysis
+from ai_regime import AIRegimeDetector
+from database_manager import DatabaseManager
+from dashboard import generate_dashboard
+import main as scanner
+import monitor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class Job:
+    def __init__(self, name, interval, func, delay=5.0):
+        """A recurring job that fires `delay` seconds after every `interval` boundary (e.g. candle close)."""
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.delay = delay
+        self.next_run = self._next_boundary(time.time())
+
+    def _next_boundary(self, now):
+        interval_s = timeframe_to_ms(self.interval) / 1000.0
+        return (now - self.delay) // interval_s * interval_s + interval_s + self.delay
+
+    def run(self):
+        started = time.monotonic()
+        try:
+            self.func()
+            logging.info(f"⏱️ Job '{self.name}' finished in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            logging.error(f"❌ Job '{self.name}' failed: {e}")
+        # Skip boundaries missed while the job was running instead of firing them back to back
+        self.next_run = self._next_boundary(time.time())
+
+
+class Scheduler:
+    def __init__(self):
+        """Runs jobs one at a time in boundary order until stop() is called."""
+        self.jobs = []
+        self._stop = threading.Event()
+
+    def add_job(self, name, interval, func, delay=5.0):
+        self.jobs.append(Job(name, interval, func, delay))
+        logging.info(f"🗓️ Scheduled '{name}' every {interval} (+{delay:.0f}s after close).")
+
+    def stop(self, *_):
+        logging.info("🛑 Stop requested. Finishing current job...")
+        self._stop.set()
+
+    def run_forever(self):
+        while not self._stop.is_set() and self.jobs:
+            job = min(self.jobs, key=lambda j: j.next_run)
+            wait = job.next_run - time.time()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            job.run()
+
+
+def run_daemon():
+    # One config for both jobs: scanner settings plus the monitor's fallback credentials
+    config = {**monitor.build_config(), **scanner.build_config()}
+
+    # Built once and reused by every cycle: exchange client, markets, caches, DB connection
+    collector = DataCollector(config)
+    if collector.exchange:
+        try:
+            collector.exchange.load_markets()
+        except Exception as e:
+            logging.warning(f"⚠️ Could not preload markets: {e}")
+    analyzer = TechnicalAnalysis()
+    ai_bot = AIRegimeDetector()
+    db = DatabaseManager(config['DB_PATH'])
+
+    delay = float(os.getenv('CLOSE_DELAY_SECONDS', 5))
+    scheduler = Scheduler()
+    scheduler.add_job('scan', os.getenv('SCAN_INTERVAL', '1h'),
+                      lambda: scanner.run_scan(config, collector, analyzer, ai_bot, db), delay)
+    scheduler.add_job('monitor', os.getenv('MONITOR_INTERVAL', '1m'),
+                      lambda: monitor.check_open_trades(db, collector, config['METRICS_TEXTFILE_DIR'],
+                                                       config['MONITOR_TIMEFRAME']), delay)
+    scheduler.add_job('dashboard', os.getenv('DASHBOARD_INTERVAL', '1h'),
+                      lambda: generate_dashboard(config['DB_PATH']), delay + 30)
+
+    signal.signal(signal.SIGINT, scheduler.stop)
+    signal.signal(signal.SIGTERM, scheduler.stop)
+
+    logging.info("🤖 Daemon started.")
+    try:
+        scheduler.run_forever()
+    finally:
+        collector.close()
+        db.close()
+        logging.info("👋 Daemon stopped.")
+
+
+if __name__ == "__main__":
+    run_daemon()
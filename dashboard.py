@@ -1,29 +1,130 @@
+import startup_profile
+startup_profile.enable_if_requested()  # Must run before the heavy imports below
+
 import sqlite3
-import pandas as pd
 import os
 import logging
+from datetime import datetime, timezone
+from metrics import percentile
+from database_manager import DatabaseManager
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 
+def _fmt(value):
+    """Formats an indicator value like pandas did (NULL renders as nan)."""
+    return f"{value:.1f}" if value is not None else "nan"
+
+def _level(value):
+    """Formats a price level; rows closed before the SL/TP columns existed hold NULL."""
+    return f"{value:.4f}" if value is not None else "n/a"
+
+CLOSED_ROWS = 20    # Most recently closed positions shown
+
+CHART_WINDOW = 24   # Cycles per rolling p50/p95 point
+CHART_POINTS = 168  # Points drawn (a week of hourly scans)
+
+def _cycle_chart(conn, cycle):
+    """Inline SVG of the rolling p50/p95 cycle time; empty until two cycles were recorded."""
+    try:
+        rows = conn.execute(
+            "SELECT started_at, total_s FROM cycle_metrics WHERE cycle = ? AND name = 'cycle' "
+            "ORDER BY started_at DESC LIMIT ?", (cycle, CHART_POINTS + CHART_WINDOW - 1)
+        ).fetchall()[::-1]
+    except sqlite3.OperationalError:
+        return ""  # Database predates the cycle_metrics table
+    if len(rows) < 2:
+        return ""
+
+    points = []
+    for i in range(max(0, len(rows) - CHART_POINTS), len(rows)):
+        window = sorted(r['total_s'] for r in rows[max(0, i - CHART_WINDOW + 1):i + 1])
+        points.append((percentile(window, 50), percentile(window, 95)))
+
+    width, height, pad = 1000, 200, 40
+    top = max(p95 for _, p95 in points) * 1.1 or 1.0
+    step = (width - 2 * pad) / (len(points) - 1)
+    def line(values):
+        return " ".join(f"{pad + i * step:.1f},{height - pad - v / top * (height - 2 * pad):.1f}" for i, v in enumerate(values))
+
+    return f"""
+                <h2 style="color: #38bdf8; font-size: 16px;">⏱️ {cycle.title()} cycle time (rolling {CHART_WINDOW}-cycle p50 / p95)</h2>
+                <svg viewBox="0 0 {width} {height}" style="width: 100%; background: #1e293b; border-radius: 12px; margin-bottom: 30px;">
+                    <line x1="{pad}" y1="{height - pad}" x2="{width - pad}" y2="{height - pad}" stroke="#334155"/>
+                    <line x1="{pad}" y1="{pad}" x2="{width - pad}" y2="{pad}" stroke="#334155" stroke-dasharray="4"/>
+                    <text x="{pad}" y="{pad - 8}" fill="#94a3b8" font-size="12">{top:.1f}s</text>
+                    <text x="{pad}" y="{height - pad + 18}" fill="#94a3b8" font-size="12">{rows[-len(points)]['started_at']}</text>
+                    <text x="{width - pad}" y="{height - pad + 18}" fill="#94a3b8" font-size="12" text-anchor="end">{rows[-1]['started_at']} UTC</text>
+                    <polyline fill="none" stroke="#f87171" stroke-width="2" points="{line(p95 for _, p95 in points)}"/>
+                    <polyline fill="none" stroke="#38bdf8" stroke-width="2" points="{line(p50 for p50, _ in points)}"/>
+                    <text x="{width - pad}" y="{pad - 8}" fill="#94a3b8" font-size="12" text-anchor="end"><tspan fill="#38bdf8">■ p50 {points[-1][0]:.1f}s</tspan>  <tspan fill="#f87171">■ p95 {points[-1][1]:.1f}s</tspan></text>
+                </svg>
+    """
+
+def _closed_table(db_path):
+    """Table of the most recently closed positions; empty until a TP or SL was hit."""
+    db = DatabaseManager(db_path)
+    try:
+        closed = db.get_closed_signals(limit=CLOSED_ROWS)
+    finally:
+        db.close()
+    if not closed:
+        return ""
+
+    rows_html = ""
+    for row in closed:
+        status_color = "#4ade80" if row['status'] == "TP_HIT" else "#f87171"
+        rows_html += f"""
+                        <tr>
+                            <td>{row['closed_at'] or "n/a"}</td>
+                            <td><strong>{row['symbol']}</strong></td>
+                            <td class="metric">{_level(row['price'])}</td>
+                            <td class="metric">{_level(row['stop_loss'])} / {_level(row['take_profit'])}</td>
+                            <td style="color: {status_color}; font-weight: bold;">{row['status']}</td>
+                            <td>{row['reason'] or "No data"}</td>
+                        </tr>
+        """
+
+    return f"""
+                <h2 style="color: #38bdf8; font-size: 16px;">🏁 Recently closed positions</h2>
+                <table style="margin-bottom: 30px;">
+                    <thead>
+                        <tr>
+                            <th>Closed (UTC)</th>
+                            <th>Pair</th>
+                            <th>Entry</th>
+                            <th>SL / TP</th>
+                            <th>Result</th>
+                            <th>Reasoning</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {rows_html}
+                    </tbody>
+                </table>
+    """
+
 def generate_dashboard(db_path="signals.db"):
     if not os.path.exists(db_path):
         logging.warning(f"❌ Database not found at {db_path}. Skipping dashboard generation.")
         return
 
     try:
-        # Connect and fetch latest 50 logs
+        # Connect and fetch latest 50 logs (plain sqlite3 rows: no pandas needed for 50 rows)
         conn = sqlite3.connect(db_path)
+        conn.row_factory = sqlite3.Row
         query = "SELECT * FROM signals ORDER BY id DESC LIMIT 50"
-        df = pd.read_sql_query(query, conn)
+        rows = conn.execute(query).fetchall()
+        charts_html = "".join(_cycle_chart(conn, cycle) for cycle in ('scan', 'monitor'))
         conn.close()
+        closed_html = _closed_table(db_path)
 
-        if df.empty:
+        if not rows:
             logging.info("📭 Database is empty. Nothing to display on dashboard.")
             return
 
         # Generate HTML Rows dynamically
         rows_html = ""
-        for _, row in df.iterrows():
+        for row in rows:
             # Color logic for Status
             status = str(row['status']).upper()
             status_color = "#4ade80" if status == "ELITE" else "#f87171"
@@ -37,8 +138,8 @@ def generate_dashboard(db_path="signals.db"):
                 <td><strong>{row['symbol']}</strong></td>
                 <td style="color: {status_color}; font-weight: bold;">{status}</td>
                 <td>{reason}</td>
-                <td>{row['rsi']:.1f}</td>
-                <td>{row['adx']:.1f}</td>
+                <td>{_fmt(row['rsi'])}</td>
+                <td>{_fmt(row['adx'])}</td>
                 <td>{row['regime_1h']}</td>
             </tr>
             """
@@ -70,7 +171,8 @@ def generate_dashboard(db_path="signals.db"):
                     <h1>🛡️ Trading Bot Audit Log</h1>
                     <div class="status-tag">Status: Live Monitoring</div>
                 </header>
-                
+                {charts_html}
+                {closed_html}
                 <table>
                     <thead>
                         <tr>
@@ -88,7 +190,7 @@ def generate_dashboard(db_path="signals.db"):
                     </tbody>
                 </table>
                 <p style="text-align: center; color: #64748b; font-size: 12px; margin-top: 30px;">
-                    Last Updated: {pd.Timestamp.now().strftime('%Y-%m-%d %H:%M:%S')} UTC
+                    Last Updated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC
                 </p>
             </div>
         </body>
@@ -106,4 +208,5 @@ def generate_dashboard(db_path="signals.db"):
 if __name__ == "__main__":
     # Use the DB_PATH environment variable if available
     target_db = os.getenv('DB_PATH', 'signals.db')
-    generate_dashboard(target_db)
+    with startup_profile.stage('generate_dashboard'):
+        generate_dashboard(target_db)
@@ -1,19 +1,130 @@
 import logging
-import pandas as pd
-import ccxt
-import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from candle_store import CandleStore, timeframe_to_ms
+from candles import CandleArray
+from bar_cache import BarCache
+from indicator_engine import IndicatorEngine
+from metrics import NULL_METRICS
+from venues import MultiVenueSource
+
+MAX_PAGE_LIMIT = 1000  # Largest OHLCV page requested in one call
+
+
+def create_exchange(name, params=None):
+    """Builds one ccxt exchange class by name, importing ccxt only on first use."""
+    import ccxt
+    return getattr(ccxt, name)(params or {})
+
+
+def fetch_ohlcv_range(exchange, symbol, timeframe, since, until, page_limit=1000, before_request=None):
+    """Pages through fetch_ohlcv from `since` to `until` (ms, inclusive) and returns one ascending list."""
+    step = timeframe_to_ms(timeframe)
+    candles = []
+    cursor = int(since)
+    while cursor <= until:
+        if before_request:
+            before_request()
+        page = exchange.fetch_ohlcv(symbol, timeframe, since=cursor, limit=page_limit)
+        if not page:
+            break
+        for candle in page:
+            if candle[0] > until:
+                break
+            if not candles or candle[0] > candles[-1][0]:
+                candles.append(candle)
+        next_cursor = page[-1][0] + step
+        if next_cursor <= cursor:
+            break
+        cursor = next_cursor
+    return candles
+
+
+def resample_ohlcv(ohlcv, timeframe):
+    """Aggregates ascending candles into `timeframe` bars on UTC epoch boundaries.
+
+    Bitget and Gate.io open their 4h and 1d candles on these boundaries, so the result lines up
+    with what the exchange would return (weekly bars are not, as epoch weeks start on Thursday).
+    A leading bucket that the history only partially covers is dropped; the last bucket is kept
+    as the forming bar, just like the exchange's own latest candle.
+    """
+    step = timeframe_to_ms(timeframe)
+    bars = []
+    for ts, o, h, l, c, v in ohlcv:
+        bucket = int(ts) // step * step
+        if bars and bars[-1][0] == bucket:
+            bar = bars[-1]
+            bar[2] = max(bar[2], h)
+            bar[3] = min(bar[3], l)
+            bar[4] = c
+            bar[5] += v
+        else:
+            bars.append([bucket, o, h, l, c, v])
+    if bars and int(ohlcv[0][0]) != bars[0][0]:
+        bars.pop(0)
+    return bars
+
 
 class DataCollector:
     def __init__(self, config):
         """Initializes the DataCollector with API keys and webhook settings."""
         self.config = config
         self.webhook_url = config.get('DISCORD_WEBHOOK_URL')
-        self.exchange = self._connect_exchange()
+        self.max_workers = int(config.get('FETCH_WORKERS') or 8)
+        self._rate_lock = threading.Lock()
+        self._next_request_at = 0.0
+        self._exchange = None
+        self._exchange_lock = threading.Lock()
+        self.store = CandleStore(config['CANDLE_DB_PATH']) if config.get('CANDLE_DB_PATH') else None
+        # Higher-timeframe regimes memoized until their next candle closes (see bar_cache.py)
+        self.bar_cache = BarCache(config['BAR_CACHE_PATH']) if config.get('BAR_CACHE_PATH') else None
+        # 1h indicator state folded one closed candle at a time across runs (see indicator_engine.py)
+        self.indicator_engine = (IndicatorEngine(config['INDICATOR_STATE_PATH'])
+                                 if config.get('INDICATOR_STATE_PATH') else None)
+        # A cycle swaps in its own CycleMetrics to collect fetch/alert timings and API counters
+        self.metrics = NULL_METRICS
+        self._alerts = None
+        self._alerts_lock = threading.Lock()
+        self.served_by = {}  # (symbol, timeframe) -> venue of the latest fetch; the store keeps it per candle
+
+    @property
+    def exchange(self):
+        """The connected ccxt client, built on first access so runs that never hit the API skip ccxt."""
+        if self._exchange is None:
+            with self._exchange_lock:
+                if self._exchange is None:
+                    self._exchange = self._connect_exchange() or False
+        return self._exchange or None
+
+    @property
+    def alerts(self):
+        """The background AlertDispatcher, started on the first alert so quiet runs never import requests."""
+        if self._alerts is None:
+            with self._alerts_lock:
+                if self._alerts is None:
+                    from alert_dispatcher import shared_dispatcher
+                    self._alerts = shared_dispatcher(self.webhook_url, self.config.get('DB_PATH') or 'signals.db')
+        return self._alerts
+
+    def close(self, alert_timeout=10.0):
+        """Gives queued alerts up to `alert_timeout` seconds to go out, then closes the candle store."""
+        if self._alerts is not None:
+            self._alerts.close(alert_timeout)
+            self._alerts = None
+        if isinstance(self._exchange, MultiVenueSource):
+            for name, stats in self._exchange.stats().items():
+                p95 = f"{stats['p95']:.2f}s" if stats['p95'] is not None else "n/a"
+                logging.info(f"🔀 {name}: served {stats['served']} | p95 {p95} | "
+                             f"errors {stats['error_rate']:.0%} | breaker {stats['breaker']}")
+            self._exchange.close()
+        if self.store:
+            self.store.close()
 
     def _connect_exchange(self):
         """Initializes the primary exchange (Bitget) with Gate.io fallback."""
         try:
-            exchange = ccxt.bitget({
+            exchange = create_exchange('bitget', {
                 'apiKey': self.config.get('BITGET_API_KEY'),
                 'secret': self.config.get('BITGET_SECRET'),
                 'password': self.config.get('BITGET_PASSWORD'),
@@ -21,12 +132,12 @@ class DataCollector:
             })
             exchange.check_required_credentials()
             logging.info("✅ Primary Exchange (BITGET) Connected Successfully.")
-            return exchange
+            return self._with_secondary(exchange)
         except Exception as e:
             logging.error(f"❌ Primary Exchange (BITGET) Failed: {e}")
             logging.info("🔄 Switched to Fallback: GATEIO")
             try:
-                fallback = ccxt.gateio({
+                fallback = create_exchange('gateio', {
                     'apiKey': self.config.get('GATEIO_API_KEY'),
                     'secret': self.config.get('GATEIO_SECRET'),
                     'enableRateLimit': True,
@@ -36,22 +147,186 @@ class DataCollector:
                 logging.error(f"❌ Fallback Exchange Failed: {ex}")
                 return None
 
+    def _with_secondary(self, primary):
+        """With HEDGED_FETCH, pairs Bitget with Gate.io in a latency-aware MultiVenueSource."""
+        if not self.config.get('HEDGED_FETCH'):
+            return primary
+        try:
+            secondary = create_exchange('gateio', {
+                'apiKey': self.config.get('GATEIO_API_KEY'),
+                'secret': self.config.get('GATEIO_SECRET'),
+                'enableRateLimit': True,
+            })
+        except Exception as e:
+            logging.error(f"❌ Secondary Exchange (GATEIO) Failed, fetching from BITGET only: {e}")
+            return primary
+        logging.info("🔀 Hedged fetching enabled: BITGET primary, GATEIO secondary.")
+        return MultiVenueSource([primary, secondary], on_event=lambda name: self.metrics.incr(name))
+
+    def _throttle(self):
+        """Spaces request start times by the exchange rateLimit, shared across worker threads."""
+        self.metrics.incr('api_calls')
+        interval = getattr(self.exchange, 'rateLimit', 0) / 1000.0
+        with self._rate_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at)
+            self._next_request_at = start_at + interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
     def fetch_data(self, symbol, timeframe, limit=100):
-        """Fetches historical OHLCV data for a given symbol and timeframe."""
+        """Fetches historical OHLCV data for a given symbol and timeframe.
+
+        When a candle store is configured, only candles newer than the last stored bar are
+        requested from the exchange and the newest `limit` bars are served from the store.
+        """
         if not self.exchange:
             logging.error("❌ No exchange connected. Cannot fetch data.")
             return None
-            
+
+        with self.metrics.timer('fetch', symbol):
+            if self.store:
+                ohlcv = self._fetch_incremental(symbol, timeframe, limit)
+            else:
+                ohlcv = self._fetch_direct(symbol, timeframe, limit)
+        venue = getattr(self.exchange, 'last_venue', None)
+        if venue:
+            self.served_by[(symbol, timeframe)] = venue
+        return ohlcv
+
+    def _fetch_direct(self, symbol, timeframe, limit):
+        """Fetches the newest `limit` bars straight from the exchange."""
         try:
+            if limit > MAX_PAGE_LIMIT:
+                return self._fetch_window(symbol, timeframe, limit) or None
+            self._throttle()
             # fetch_ohlcv returns a list of [timestamp, open, high, low, close, volume]
             ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
             if not ohlcv:
                 return None
             return ohlcv
         except Exception as e:
+            self.metrics.incr('api_errors')
             logging.error(f"❌ Error fetching {symbol} on {timeframe}: {e}")
             return None
 
+    def _fetch_window(self, symbol, timeframe, limit, since=None):
+        """Paginates from `since` (default: `limit` bars ago) up to the current bar."""
+        step = timeframe_to_ms(timeframe)
+        now = int(time.time() * 1000)
+        if since is None:
+            since = (now // step - (limit - 1)) * step
+        return fetch_ohlcv_range(self.exchange, symbol, timeframe, since, now,
+                                 page_limit=min(limit, MAX_PAGE_LIMIT), before_request=self._throttle)
+
+    def _fetch_incremental(self, symbol, timeframe, limit):
+        """Tops up the local candle store with a delta fetch and returns the newest `limit` bars."""
+        exchange_id = self.exchange.id
+        try:
+            last_ts = self.store.last_timestamp(exchange_id, symbol, timeframe)
+            step = timeframe_to_ms(timeframe)
+            window_start = (int(time.time() * 1000) // step - (limit - 1)) * step
+            if (last_ts is None or last_ts < window_start
+                    or self.store.count(exchange_id, symbol, timeframe, since=window_start, until=last_ts)
+                    < (last_ts - window_start) // step + 1):
+                # Cold start, a gap wider than the window, or a window the store only partly holds
+                # (e.g. a 100-bar footprint asked for the (limit+1)*24 bars of a 1d resample): full snapshot
+                ohlcv = self._fetch_window(symbol, timeframe, limit)
+            else:
+                # Re-request from the last stored bar, which may have still been forming
+                ohlcv = self._fetch_window(symbol, timeframe, limit, since=last_ts)
+            self.store.upsert(exchange_id, symbol, timeframe, ohlcv, venue=getattr(self.exchange, 'last_venue', None))
+            candles = self.store.load(exchange_id, symbol, timeframe, limit=limit)
+            return candles or None
+        except Exception as e:
+            self.metrics.incr('api_errors')
+            logging.error(f"❌ Error fetching {symbol} on {timeframe}: {e}")
+            return None
+
+    def fetch_resampled(self, symbol, timeframes, limit=100, base_timeframe='1h', as_arrays=False):
+        """Fetches only `base_timeframe` history and builds the other timeframes from it locally.
+
+        Every returned timeframe comes from the same snapshot, in the order given. With
+        `as_arrays` the series are CandleArrays, resampled without leaving NumPy.
+        """
+        base_ms = timeframe_to_ms(base_timeframe)
+        widest = max(timeframe_to_ms(tf) for tf in timeframes) // base_ms
+        # One extra bucket absorbs the partial leading bar resample_ohlcv drops
+        base = self.fetch_data(symbol, base_timeframe, (limit + 1) * widest)
+        if not base:
+            return {tf: None for tf in timeframes}
+        if as_arrays:
+            base = CandleArray.from_ohlcv(base)
+            return {tf: (base if tf == base_timeframe else base.resample(tf)).tail(limit) or None
+                    for tf in timeframes}
+        return {
+            tf: (base if tf == base_timeframe else resample_ohlcv(base, tf))[-limit:] or None
+            for tf in timeframes
+        }
+
+    def fetch_many(self, symbols, timeframes, limit=100, resample=False, as_arrays=False, skip=()):
+        """Fetches every (symbol, timeframe) pair concurrently through a bounded worker pool.
+
+        Returns {symbol: {timeframe: ohlcv or None}}, with timeframes in the order given,
+        so each entry is the same tf_data dict the sequential loop used to build.
+        With `resample`, each symbol makes one 1h request and higher timeframes are built locally.
+        With `as_arrays`, each series is a CandleArray instead of a list of ccxt rows.
+        (symbol, timeframe) pairs in `skip` are not requested and left out of the result.
+        """
+        if resample:
+            workers = max(1, min(self.max_workers, len(symbols)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [(symbol, pool.submit(self.fetch_resampled, symbol, timeframes, limit, as_arrays=as_arrays))
+                           for symbol in symbols]
+                return {symbol: future.result() for symbol, future in futures}
+
+        jobs = [(symbol, tf) for symbol in symbols for tf in timeframes if (symbol, tf) not in skip]
+        results = {symbol: {} for symbol in symbols}
+        if not jobs:
+            return results
+
+        workers = max(1, min(self.max_workers, len(jobs)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(symbol, tf, pool.submit(self.fetch_data, symbol, tf, limit)) for symbol, tf in jobs]
+            for symbol, tf, future in futures:
+                ohlcv = future.result()
+                results[symbol][tf] = CandleArray.from_ohlcv(ohlcv) if as_arrays and ohlcv else ohlcv
+        return results
+
+    def fetch_since(self, starts, timeframe):
+        """Fetches every candle from {symbol: since_ms} up to the forming bar, one paginated request per symbol.
+
+        Returns {symbol: ohlcv or None}; symbols are fetched concurrently like fetch_many.
+        """
+        if not self.exchange or not starts:
+            return {symbol: None for symbol in starts}
+
+        def fetch(symbol, since):
+            try:
+                with self.metrics.timer('fetch', symbol):
+                    return self._fetch_window(symbol, timeframe, MAX_PAGE_LIMIT, since=since) or None
+            except Exception as e:
+                self.metrics.incr('api_errors')
+                logging.error(f"❌ Error fetching {symbol} on {timeframe} since {since}: {e}")
+                return None
+
+        workers = max(1, min(self.max_workers, len(starts)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [(symbol, pool.submit(fetch, symbol, since)) for symbol, since in starts.items()]
+            return {symbol: future.result() for symbol, future in futures}
+
+    def fetch_tickers(self):
+        """One bulk snapshot of every ticker on the exchange ({} if unsupported or failed)."""
+        if not self.exchange or not self.exchange.has.get('fetchTickers'):
+            return {}
+        try:
+            self._throttle()
+            return self.exchange.fetch_tickers()
+        except Exception as e:
+            self.metrics.incr('api_errors')
+            logging.error(f"❌ Bulk ticker snapshot failed: {e}")
+            return {}
+
     def _send_discord_alert(self, message):
         """Sends a basic, plain-text alert to Discord."""
         if not self.webhook_url:
@@ -60,9 +335,12 @@ class DataCollector:
             
         payload = {"content": message}
         try:
-            response = requests.post(self.webhook_url, json=payload)
-            response.raise_for_status()
+            # Queued for the background dispatcher: delivery and its retries never block the caller
+            with self.metrics.timer('alert'):
+                self.alerts.send(payload)
+            self.metrics.incr('alerts_queued')
         except Exception as e:
+            self.metrics.incr('alert_errors')
             logging.error(f"❌ Basic Alert Error: {e}")
 
     def send_formatted_alert(self, symbol, entry, sl, tp, rsi, adx):
@@ -86,8 +364,10 @@ class DataCollector:
         }
         
         try:
-            response = requests.post(self.webhook_url, json=payload)
-            response.raise_for_status()
-            logging.info(f"✅ Formatted alert sent for {symbol}.")
+            with self.metrics.timer('alert', symbol):
+                self.alerts.send(payload)
+            self.metrics.incr('alerts_queued')
+            logging.info(f"📨 Formatted alert queued for {symbol}.")
         except Exception as e:
+            self.metrics.incr('alert_errors')
             logging.error(f"❌ Formatted Alert Error: {e}")
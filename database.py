@@ -1,13 +1,20 @@
-import sqlite3
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from database_manager import connect_sqlite
 
 class SignalDatabase:
     def __init__(self, db_path='signals.db'):
         self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = connect_sqlite(db_path)
+        self._batch_depth = 0
+        self._pending_adds = []
+        self._pending_removes = []
         self.init_db()
 
     def init_db(self):
-        with sqlite3.connect(self.db_path) as conn:
+        with self._lock, self._conn as conn:
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS active_signals (
                     id INTEGER PRIMARY KEY,
@@ -20,18 +27,52 @@ class SignalDatabase:
                 )
             ''')
 
+    @contextmanager
+    def batch(self):
+        """Buffers adds/removes made inside the block and commits them in one transaction."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        with self._lock:
+            adds, removes = self._pending_adds, self._pending_removes
+            self._pending_adds, self._pending_removes = [], []
+            if not adds and not removes:
+                return
+            with self._conn as conn:
+                if adds:
+                    conn.executemany('''
+                        INSERT INTO active_signals (ticker, side, entry_price, sl, tp, timestamp)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    ''', adds)
+                if removes:
+                    conn.executemany('DELETE FROM active_signals WHERE id = ?', removes)
+
     def add_signal(self, ticker, side, entry_price, sl, tp):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
-                INSERT INTO active_signals (ticker, side, entry_price, sl, tp, timestamp)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (ticker, side, entry_price, sl, tp, datetime.now().isoformat()))
+        with self._lock:
+            self._pending_adds.append((ticker, side, entry_price, sl, tp, datetime.now().isoformat()))
+            if not self._batch_depth:
+                self.flush()
 
     def get_active_signals(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute('SELECT * FROM active_signals')
+        with self._lock:
+            cursor = self._conn.execute('SELECT * FROM active_signals')
             return cursor.fetchall()
 
     def remove_signal(self, signal_id):
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('DELETE FROM active_signals WHERE id = ?', (signal_id,))
+        with self._lock:
+            self._pending_removes.append((signal_id,))
+            if not self._batch_depth:
+                self.flush()
+
+    def close(self):
+        with self._lock:
+            self.flush()
+            self._conn.close()
@@ -1,16 +1,57 @@
 import sqlite3
 import logging
 import os
+import threading
+from contextlib import contextmanager
+
+OPEN_STATUS = 'ELITE'
+CLOSED_STATUSES = ('TP_HIT', 'SL_HIT')
+CLOSED_SQL = ", ".join(f"'{status}'" for status in CLOSED_STATUSES)  # Literal, so the partial index applies
+
+# Columns added after the first schema; older tables are migrated in place
+LATE_COLUMNS = {'stop_loss': 'REAL', 'take_profit': 'REAL', 'closed_at': 'DATETIME', 'checkpoint_ts': 'INTEGER'}
+
+INSERT_SIGNAL_SQL = '''
+    INSERT INTO signals (
+        symbol, price, regime_1h, regime_4h, regime_1d,
+        rsi, adx, atr, is_aligned, status, reason, hour_of_day,
+        stop_loss, take_profit
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+INSERT_METRIC_SQL = '''
+    INSERT INTO cycle_metrics (started_at, cycle, kind, name, symbol, count, total_s, p50_s, p95_s, max_s)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+UPDATE_STATUS_SQL = (
+    "UPDATE signals SET status = ?, reason = ?, "
+    "closed_at = CASE WHEN ? THEN CURRENT_TIMESTAMP ELSE closed_at END WHERE id = ?"
+)
+UPDATE_CHECKPOINT_SQL = "UPDATE signals SET checkpoint_ts = ? WHERE id = ?"
+
+
+def connect_sqlite(db_path):
+    """Opens a long-lived SQLite connection in WAL mode so readers never block the writer."""
+    conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
 
 class DatabaseManager:
     def __init__(self, db_path='signals.db'):
         self.db_path = db_path
+        self._lock = threading.RLock()
+        self._conn = connect_sqlite(db_path)
+        self._batch_depth = 0
+        self._pending_inserts = []
+        self._pending_updates = []
+        self._pending_checkpoints = []
         self._init_db()
 
     def _init_db(self):
         """Initializes the database and ensures all modern columns exist."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self._lock, self._conn as conn:
                 cursor = conn.cursor()
                 
                 # Check if the table exists
@@ -43,31 +84,167 @@ class DatabaseManager:
                         is_aligned INTEGER,
                         status TEXT,
                         reason TEXT,
-                        hour_of_day INTEGER
+                        hour_of_day INTEGER,
+                        stop_loss REAL,
+                        take_profit REAL,
+                        closed_at DATETIME,
+                        checkpoint_ts INTEGER
+                    )
+                ''')
+
+                # Older tables predate the SL/TP columns the backtester grades against
+                cursor.execute("PRAGMA table_info(signals)")
+                columns = [col[1] for col in cursor.fetchall()]
+                for column, column_type in LATE_COLUMNS.items():
+                    if column not in columns:
+                        cursor.execute(f"ALTER TABLE signals ADD COLUMN {column} {column_type}")
+
+                # Open positions are a tiny slice of the audit log: index only those rows
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_signals_open ON signals(id) WHERE status = '{OPEN_STATUS}'")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals(symbol, timestamp)")
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_signals_aligned ON signals(is_aligned)")
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_signals_closed ON signals(closed_at) WHERE status IN ({CLOSED_SQL})")
+
+                # One row per stage/counter of every scan or monitor cycle (see metrics.py)
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS cycle_metrics (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        started_at DATETIME,
+                        cycle TEXT,
+                        kind TEXT,
+                        name TEXT,
+                        symbol TEXT,
+                        count INTEGER,
+                        total_s REAL,
+                        p50_s REAL,
+                        p95_s REAL,
+                        max_s REAL
                     )
                 ''')
-                conn.commit()
+                cursor.execute("CREATE INDEX IF NOT EXISTS idx_cycle_metrics_name ON cycle_metrics(cycle, name, started_at)")
                 logging.info("✅ Database Schema is up to date.")
         except Exception as e:
             logging.error(f"❌ DB Initialization Error: {e}")
 
+    @contextmanager
+    def batch(self):
+        """Buffers every write made inside the block and commits them in one transaction on exit."""
+        with self._lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        """Writes buffered rows with executemany inside a single transaction.
+
+        Returns True once they are committed. On failure the rows stay buffered and the next
+        flush (or close) retries them.
+        """
+        with self._lock:
+            inserts, updates = self._pending_inserts, self._pending_updates
+            checkpoints = self._pending_checkpoints
+            self._pending_inserts, self._pending_updates, self._pending_checkpoints = [], [], []
+            if not inserts and not updates and not checkpoints:
+                return True
+            try:
+                with self._conn:
+                    if inserts:
+                        self._conn.executemany(INSERT_SIGNAL_SQL, inserts)
+                    if updates:
+                        self._conn.executemany(UPDATE_STATUS_SQL, updates)
+                    if checkpoints:
+                        self._conn.executemany(UPDATE_CHECKPOINT_SQL, checkpoints)
+            except Exception as e:
+                # Nothing was committed: put the rows back ahead of any buffered since
+                self._pending_inserts = inserts + self._pending_inserts
+                self._pending_updates = updates + self._pending_updates
+                self._pending_checkpoints = checkpoints + self._pending_checkpoints
+                logging.error(f"❌ DB Flush Error ({len(inserts)} inserts, {len(updates)} updates kept for retry): {e}")
+                return False
+            for row in inserts:
+                logging.info(f"💾 {row[0]} logged as {row[9]}")
+            if len(inserts) + len(updates) > 1:
+                logging.info(f"💾 Committed {len(inserts)} new and {len(updates)} updated signals.")
+            return True
+
+    def close(self):
+        """Flushes pending rows and closes the connection, folding the WAL back into the main file."""
+        with self._lock:
+            self.flush()
+            try:
+                self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except Exception as e:
+                logging.error(f"❌ DB Checkpoint Error: {e}")
+            self._conn.close()
+
     def save_signal(self, symbol, price, regimes, df_row, sl, tp, is_aligned, status, reason, hour_of_day):
-        """Saves audit data to the database."""
+        """Saves audit data to the database (buffered until the end of an open batch)."""
+        row = (
+            symbol, price,
+            regimes.get('1h', 'UNKNOWN'),
+            regimes.get('4h', 'UNKNOWN'),
+            regimes.get('1d', 'UNKNOWN'),
+            df_row['rsi'], df_row['adx'], df_row['atr'],
+            1 if is_aligned else 0, status, reason, hour_of_day,
+            sl, tp
+        )
+        with self._lock:
+            self._pending_inserts.append(row)
+            if not self._batch_depth:
+                self.flush()
+
+    def save_cycle_metrics(self, rows):
+        """Writes the rows of one finished cycle (CycleMetrics.rows()) in a single transaction."""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute('''
-                    INSERT INTO signals (
-                        symbol, price, regime_1h, regime_4h, regime_1d, 
-                        rsi, adx, atr, is_aligned, status, reason, hour_of_day
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    symbol, price, 
-                    regimes.get('1h', 'UNKNOWN'), 
-                    regimes.get('4h', 'UNKNOWN'), 
-                    regimes.get('1d', 'UNKNOWN'),
-                    df_row['rsi'], df_row['adx'], df_row['atr'], 
-                    1 if is_aligned else 0, status, reason, hour_of_day
-                ))
-                logging.info(f"💾 {symbol} logged as {status}")
+            with self._lock, self._conn:
+                self._conn.executemany(INSERT_METRIC_SQL, rows)
         except Exception as e:
-            logging.error(f"❌ DB Save Error for {symbol}: {e}")
+            logging.error(f"❌ Metrics Write Error: {e}")
+
+    def get_open_signals(self, symbol=None):
+        """Returns open (ELITE) positions as dicts, optionally for one symbol."""
+        query = f"SELECT * FROM signals WHERE status = '{OPEN_STATUS}'"
+        params = ()
+        if symbol:
+            query += " AND symbol = ?"
+            params = (symbol,)
+        return self._fetch_dicts(query + " ORDER BY id", params, "get_open_signals")
+
+    def get_closed_signals(self, limit=None):
+        """Returns closed positions (TP/SL hit), most recently closed first."""
+        query = f"SELECT * FROM signals WHERE status IN ({CLOSED_SQL}) ORDER BY closed_at DESC, id DESC"
+        params = []
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+        return self._fetch_dicts(query, params, "get_closed_signals")
+
+    def _fetch_dicts(self, query, params, label):
+        """Runs a read on the shared connection and returns rows as dicts."""
+        try:
+            with self._lock:
+                cursor = self._conn.execute(query, params)
+                columns = [col[0] for col in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        except Exception as e:
+            logging.error(f"❌ DB Read Error ({label}): {e}")
+            return []
+
+    def update_signal_status(self, signal_id, new_status, reason):
+        """Moves a position to a new status; closing statuses also stamp closed_at."""
+        with self._lock:
+            self._pending_updates.append((new_status, reason, 1 if new_status in CLOSED_STATUSES else 0, signal_id))
+            if not self._batch_depth:
+                self.flush()
+
+    def advance_checkpoints(self, checkpoints):
+        """Stores {signal_id: ms} as the open time of the first candle each position still has to be checked from."""
+        with self._lock:
+            self._pending_checkpoints.extend((int(ts), signal_id) for signal_id, ts in checkpoints.items())
+            if not self._batch_depth:
+                self.flush()
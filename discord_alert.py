@@ -1,21 +1,28 @@
 import logging
-from discord import Embed, SyncWebhook
+from discord import Embed
+from alert_dispatcher import shared_dispatcher
 
 class DiscordAlerter:
-    def __init__(self, webhook_url):
+    def __init__(self, webhook_url, db_path='signals.db'):
         """
-        Initializes the synchronous webhook.
+        Initializes the background webhook dispatcher.
         If the URL is missing, it will log a warning.
         """
         self.webhook = None
         if webhook_url:
             try:
-                self.webhook = SyncWebhook.from_url(webhook_url)
+                self.webhook = shared_dispatcher(webhook_url, db_path)
             except Exception as e:
                 logging.error(f"Failed to initialize Discord Webhook: {e}")
         else:
             logging.warning("No DISCORD_WEBHOOK_URL provided. Alerts are disabled.")
 
+    def close(self, timeout=10.0):
+        """Flushes queued alerts (up to `timeout` seconds); undelivered ones are kept for the next run."""
+        if self.webhook:
+            self.webhook.close(timeout)
+            self.webhook = None
+
     def send_new_signal(self, signal, entry, sl, tp):
         """Formats and sends a high-visibility trading signal embed."""
         if not self.webhook:
@@ -34,7 +41,7 @@ class DiscordAlerter:
             confidence = signal.get('confidence', 0)
             embed.add_field(name="Confidence", value=f"{confidence*100:.0f}%", inline=False)
             
-            self.webhook.send(embed=embed)
+            self.webhook.send({"embeds": [embed.to_dict()]})
         except Exception as e:
             logging.error(f"Discord send_new_signal failed: {e}")
 
@@ -46,6 +53,6 @@ class DiscordAlerter:
         try:
             # Color 0x3498db is Blue for 'Update'
             embed = Embed(title="🔔 Signal Update", description=message, color=0x3498db)
-            self.webhook.send(embed=embed)
+            self.webhook.send({"embeds": [embed.to_dict()]})
         except Exception as e:
             logging.error(f"Discord send_update failed: {e}")
@@ -0,0 +1,199 @@
+import os
+import json
+import math
+import time
+import logging
+from candle_store import timeframe_to_ms
+from candles import CandleArray
+
+RSI_LENGTH = 14
+ADX_LENGTH = 14
+ATR_LENGTH = 14
+EMA_LENGTHS = (20, 50)
+
+
+def _rma(prev, value, length):
+    """One step of Wilder's moving average (ewm alpha=1/length, adjust=False)."""
+    if value is None or math.isnan(value):
+        return prev
+    if prev is None:
+        return value
+    return prev + (value - prev) / length
+
+
+class IndicatorState:
+    """O(1) recurrence state for RSI/ADX/ATR/EMA on one (symbol, timeframe) series.
+
+    technical_analysis.indicator_columns is its vectorized twin (the pandas_ta_openbb formulas
+    the bot used to call): RSI and the ADX directional moves use an unseeded Wilder RMA, ATR is seeded with
+    the SMA of the first true ranges, and EMAs are seeded with the SMA of the first closes.
+    """
+
+    FIELDS = ('count', 'last_ts', 'prev_high', 'prev_low', 'prev_close', 'rsi_up', 'rsi_down',
+              'tr_sum', 'atr', 'dm_plus', 'dm_minus', 'adx', 'ema_sums', 'emas')
+
+    def __init__(self):
+        self.count = 0
+        self.last_ts = None
+        self.prev_high = self.prev_low = self.prev_close = None
+        self.rsi_up = self.rsi_down = None
+        self.tr_sum = 0.0
+        self.atr = None
+        self.dm_plus = self.dm_minus = None
+        self.adx = None
+        self.ema_sums = {str(n): 0.0 for n in EMA_LENGTHS}
+        self.emas = {str(n): None for n in EMA_LENGTHS}
+
+    def update(self, candle):
+        """Folds one closed [timestamp, open, high, low, close, volume] candle into the state."""
+        ts, high, low, close = int(candle[0]), float(candle[2]), float(candle[3]), float(candle[4])
+        i = self.count
+
+        # ATR: SMA of the first true ranges (bar 0 has no previous close), then Wilder smoothing
+        tr = high - low
+        if i > 0:
+            tr = max(tr, abs(high - self.prev_close), abs(self.prev_close - low))
+        if i < ATR_LENGTH - 1:
+            self.tr_sum += tr
+        elif i == ATR_LENGTH - 1:
+            self.atr = (self.tr_sum + tr) / ATR_LENGTH
+        else:
+            self.atr = _rma(self.atr, tr, ATR_LENGTH)
+
+        if i > 0:
+            # RSI: Wilder averages of gains and losses
+            change = close - self.prev_close
+            self.rsi_up = _rma(self.rsi_up, max(change, 0.0), RSI_LENGTH)
+            self.rsi_down = _rma(self.rsi_down, min(change, 0.0), RSI_LENGTH)
+
+            # ADX: smoothed directional movement, then smoothed DX once ATR exists
+            up, down = high - self.prev_high, self.prev_low - low
+            self.dm_plus = _rma(self.dm_plus, up if (up > down and up > 0) else 0.0, ADX_LENGTH)
+            self.dm_minus = _rma(self.dm_minus, down if (down > up and down > 0) else 0.0, ADX_LENGTH)
+            if self.atr is not None:
+                total = self.dm_plus + self.dm_minus
+                dx = 100.0 * abs(self.dm_plus - self.dm_minus) / total if total else float('nan')
+                self.adx = _rma(self.adx, dx, ADX_LENGTH)
+
+        for key in self.emas:
+            length = int(key)
+            if i < length:
+                self.ema_sums[key] += close
+                if i == length - 1:
+                    self.emas[key] = self.ema_sums[key] / length
+            else:
+                self.emas[key] += (close - self.emas[key]) * 2.0 / (length + 1)
+
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+        self.last_ts = ts
+        self.count += 1
+
+    def values(self):
+        """Returns the indicator row for the last folded candle (NaN while still warming up)."""
+        nan = float('nan')
+        rsi = nan
+        if self.rsi_up is not None:
+            total = self.rsi_up + abs(self.rsi_down)
+            rsi = 100.0 * self.rsi_up / total if total else nan
+        row = {
+            'timestamp': self.last_ts,
+            'close': self.prev_close,
+            'rsi': rsi,
+            'adx': self.adx if self.adx is not None else nan,
+            'atr': self.atr if self.atr is not None else nan,
+        }
+        for key, value in self.emas.items():
+            row[f'ema_{key}'] = value if value is not None else nan
+        return row
+
+    def copy(self):
+        return IndicatorState.from_dict(self.to_dict())
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        for field in cls.FIELDS:
+            value = data.get(field, getattr(state, field))
+            setattr(state, field, dict(value) if isinstance(value, dict) else value)
+        return state
+
+
+class IndicatorEngine:
+    def __init__(self, path=None, max_idle_ms=24 * 3_600_000):
+        """Keeps one IndicatorState per (symbol, timeframe), optionally persisted as JSON between runs.
+
+        Each scan folds only the candles that closed since the last one, so a restart resumes
+        in O(1) per candle instead of re-folding the window. The values therefore follow the
+        whole folded history rather than a fresh 100-candle window; they differ from the
+        window-seeded replay values only by the seed's decayed weight. States idle for longer than
+        `max_idle_ms` are dropped on evict() and reseeded from the next window.
+        """
+        self.path = path
+        self.max_idle_ms = max_idle_ms
+        self.states = {}
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def update(self, symbol, timeframe, candles, now_ms=None):
+        """Folds newly closed candles into the state and returns the latest indicator row.
+
+        Candles already folded are skipped, so the full window of a scan can be passed every run.
+        If the window starts after the bar following the state (missed bars), the state is
+        reseeded from the window. A still-forming last candle is evaluated on a copy of the state
+        and never committed, which matches the row latest_indicators reports for the same window.
+        """
+        candles = CandleArray.from_ohlcv(candles)
+        if not len(candles):
+            return None
+        key = f"{symbol}|{timeframe}"
+        now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+        step = timeframe_to_ms(timeframe)
+        state = self.states.get(key)
+
+        if state is None or candles.data[0, 0] > state.last_ts + step:
+            if state is not None:
+                logging.warning(f"⚠️ Gap in {symbol} {timeframe} candles. Reseeding indicator state from the window.")
+            state = self.states[key] = IndicatorState()
+
+        forming = None
+        for candle in candles.rows():
+            if state.last_ts is not None and candle[0] <= state.last_ts:
+                continue
+            if candle[0] + step > now_ms:
+                forming = candle
+                break
+            state.update(candle)
+
+        if forming is None:
+            return state.values()
+        preview = state.copy()
+        preview.update(forming)
+        return preview.values()
+
+    def evict(self, now_ms):
+        """Drops states that have not folded a candle for `max_idle_ms` (e.g. screener drop-outs)."""
+        self.states = {key: state for key, state in self.states.items()
+                       if state.last_ts is not None and state.last_ts >= now_ms - self.max_idle_ms}
+
+    def save(self, path=None):
+        """Writes every series state to a JSON file so the next run resumes in O(1)."""
+        path = path or self.path
+        data = {key: state.to_dict() for key, state in self.states.items()}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def load(self, path=None):
+        """Restores series states written by save(); a corrupt file starts the engine cold."""
+        path = path or self.path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.states = {key: IndicatorState.from_dict(value) for key, value in data.items()}
+        except Exception as e:
+            logging.error(f"❌ Failed to restore indicator state from {path}: {e}")
+            self.states = {}
@@ -1,70 +1,194 @@
+import startup_profile
+startup_profile.enable_if_requested()  # Must run before the heavy imports below
+
 import os
+import time
 import logging
-import pandas as pd
+from datetime import datetime
+from candles import CandleArray
 from data_collection import DataCollector
 from technical_analysis import TechnicalAnalysis
 from ai_regime import AIRegimeDetector
 from database_manager import DatabaseManager
+from metrics import CycleMetrics, NULL_METRICS, report_cycle
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def main():
-    config = {
+SYMBOLS = ["BTC/USDT", "ETH/USDT", "SOL/USDT", "BNB/USDT", "LINK/USDT", "XRP/USDT", "FET/USDT", "DOGE/USDT"]
+TIMEFRAMES = ['1d', '4h', '1h']
+ADX_THRESHOLD = 25  # Minimum 1h ADX for an ELITE setup
+SL_ATR_MULTIPLIER = 1.5
+TP_ATR_MULTIPLIER = 3.0
+
+def build_config():
+    """Reads the scanner settings from the environment."""
+    return {
         'BITGET_API_KEY': os.getenv('BITGET_API_KEY'),
         'BITGET_SECRET': os.getenv('BITGET_SECRET'),
         'BITGET_PASSWORD': os.getenv('BITGET_PASSWORD'),
         'DISCORD_WEBHOOK_URL': os.getenv('DISCORD_WEBHOOK_URL'),
-        'DB_PATH': os.getenv('DB_PATH', 'signals.db')  # Dynamic lookup with fallback
+        'DB_PATH': os.getenv('DB_PATH', 'signals.db'),  # Dynamic lookup with fallback
+        'CANDLE_DB_PATH': os.getenv('CANDLE_DB_PATH', 'candles.db'),
+        'FETCH_WORKERS': os.getenv('FETCH_WORKERS', 8),
+        # Build 4h/1d from one 1h fetch instead of requesting each timeframe
+        'RESAMPLE_HIGHER_TF': os.getenv('RESAMPLE_HIGHER_TF', 'false').lower() in ('1', 'true', 'yes'),
+        # Directory for a Prometheus textfile (node_exporter textfile collector); off when unset
+        'METRICS_TEXTFILE_DIR': os.getenv('METRICS_TEXTFILE_DIR'),
+        # Race slow Bitget requests against Gate.io (see venues.py)
+        'HEDGED_FETCH': os.getenv('HEDGED_FETCH', 'false').lower() in ('1', 'true', 'yes'),
+        # Screener mode: scan every liquid USDT spot pair instead of SYMBOLS (see screener.py)
+        'SCREENER': os.getenv('SCREENER', 'false').lower() in ('1', 'true', 'yes'),
+        'SCREENER_MIN_QUOTE_VOLUME': float(os.getenv('SCREENER_MIN_QUOTE_VOLUME', 1_000_000)),
+        'SCREENER_MAX_SYMBOLS': int(os.getenv('SCREENER_MAX_SYMBOLS', 100)),
+        # JSON file memoizing 4h/1d regimes until their next candle closes; off when unset
+        'BAR_CACHE_PATH': os.getenv('BAR_CACHE_PATH'),
+        # JSON file persisting the incremental 1h indicator state between runs; off when unset
+        'INDICATOR_STATE_PATH': os.getenv('INDICATOR_STATE_PATH')
     }
 
-    collector = DataCollector(config)
-    analyzer = TechnicalAnalysis()
-    ai_bot = AIRegimeDetector()
-    db = DatabaseManager(config['DB_PATH'])
-
-    for symbol in ["BTC/USDT", "ETH/USDT", "SOL/USDT", "BNB/USDT", "LINK/USDT", "XRP/USDT", "FET/USDT", "DOGE/USDT"]:
-        try:
-            logging.info(f"🔍 Analyzing {symbol}...")
-            tf_data = {tf: collector.fetch_data(symbol, tf, 100) for tf in ['1d', '4h', '1h']}
-            
-            if not all(tf_data.values()): 
-                logging.warning(f"⚠️ Skipping {symbol}: Incomplete candle data fetched.")
+def analyze_symbol(symbol, tf_data, collector, analyzer, ai_bot, db, hour_of_day=None, metrics=NULL_METRICS,
+                   bar_cache=None, now_ms=None, indicator_engine=None):
+    """Runs the alignment + ADX decision for one symbol's {timeframe: ohlcv} data.
+
+    Alerts go through `collector` and the audit row through `db`; either may be None
+    (e.g. offline replays). With a `bar_cache`, timeframes it still holds need no candles in
+    `tf_data` and fresh results are stored in it. With an `indicator_engine`, the 1h row comes
+    from its persisted state and only newly closed candles are folded. Returns the decision as a dict, or None if
+    data is incomplete.
+    """
+    now_ms = now_ms if now_ms is not None else int(time.time() * 1000)
+    cached = bar_cache.valid(symbol, now_ms) if bar_cache else []
+    missing = [tf for tf in TIMEFRAMES if tf not in cached]
+    if not all(tf_data.get(tf) is not None and len(tf_data[tf]) for tf in missing):
+        logging.warning(f"⚠️ Skipping {symbol}: Incomplete candle data fetched.")
+        return None
+
+    # Analyze Regimes
+    # Regimes only need closes, and only the 1h indicator row is used: no DataFrames per timeframe
+    with metrics.timer('indicators', symbol):
+        if indicator_engine:
+            row_1h = indicator_engine.update(symbol, '1h', tf_data['1h'], now_ms)
+        else:
+            row_1h = analyzer.latest_indicators(CandleArray.from_ohlcv(tf_data['1h']))
+    regimes = {}
+    for tf in TIMEFRAMES:
+        with metrics.timer('regime', symbol):
+            if tf in cached:
+                # The forming bar of every timeframe closes at the current 1h close
+                regimes[tf] = bar_cache.regime(symbol, tf, row_1h['close'], now_ms)
                 continue
+            candles = CandleArray.from_ohlcv(tf_data[tf])
+            regimes[tf] = ai_bot.detect_regime(candles)
+            if bar_cache and tf in bar_cache.timeframes:
+                bar_cache.store(symbol, tf, candles, now_ms)
+
+    atr = row_1h['atr']
+    entry_price = row_1h['close']
+
+    # Check for ELITE Setup (Alignment + ADX > 25)
+    is_aligned = (regimes['1h'] == regimes['4h'] == regimes['1d'] == 'BULLISH')
+    is_strong = row_1h['adx'] > ADX_THRESHOLD
+
+    if is_aligned and is_strong:
+        # Dynamic SL/TP Calculation
+        sl = entry_price - (SL_ATR_MULTIPLIER * atr)
+        tp = entry_price + (TP_ATR_MULTIPLIER * atr)
+    
+        status = "ELITE"
+        reason = "✅ Triple-Timeframe Bullish Alignment"
+    
+        # Send Enhanced Discord Alert
+        if collector:
+            collector.send_formatted_alert(symbol, entry_price, sl, tp, row_1h['rsi'], row_1h['adx'])
+    else:
+        sl, tp = None, None  # Stored as NULL: a rejected setup has no levels to grade
+        status = "REJECTED"
+        reason = f"Trend Gap or Weak ADX ({row_1h['adx']:.1f})"
+
+    if hour_of_day is None:
+        hour_of_day = datetime.now().hour
+    if db:
+        db.save_signal(symbol, entry_price, regimes, row_1h, sl, tp, is_aligned, status, reason, hour_of_day)
+
+    return {
+        'symbol': symbol, 'price': entry_price, 'regimes': regimes, 'row': row_1h,
+        'stop_loss': sl, 'take_profit': tp, 'is_aligned': is_aligned, 'status': status, 'reason': reason
+    }
+
+def select_symbols(config, collector, metrics=NULL_METRICS):
+    """The fixed SYMBOLS list, or the screener's survivors when SCREENER is on."""
+    if not config.get('SCREENER'):
+        return SYMBOLS
+    from screener import UniverseScreener
+    screener = UniverseScreener(collector, config['SCREENER_MIN_QUOTE_VOLUME'],
+                                max_symbols=config['SCREENER_MAX_SYMBOLS'])
+    try:
+        with metrics.timer('screen'):
+            return screener.screen(metrics)
+    except Exception as e:
+        metrics.incr('symbol_errors')
+        logging.error(f"❌ Screener failed, scanning the default symbols: {e}")
+        return SYMBOLS
+
+def run_scan(config, collector, analyzer, ai_bot, db):
+    """Runs one scan cycle with already-constructed clients, so a daemon can keep them warm."""
+    metrics = CycleMetrics('scan')
+    collector.metrics = metrics
+    try:
+        symbols = select_symbols(config, collector, metrics)
+        now_ms = int(time.time() * 1000)
+        bar_cache = collector.bar_cache
+        indicator_engine = collector.indicator_engine
+
+        # Higher timeframes whose last closed candle is already analyzed are neither fetched nor recomputed
+        cached = {(symbol, tf) for symbol in symbols for tf in (bar_cache.valid(symbol, now_ms) if bar_cache else ())}
+        if cached:
+            metrics.incr('bar_cache_hits', len(cached))
+
+        # Fetch every symbol/timeframe up front so the cycle waits on the slowest request, not the sum
+        logging.info(f"⚡ Fetching candles for {len(symbols)} symbols concurrently...")
+        with metrics.timer('fetch_all'):
+            market_data = collector.fetch_many(symbols, TIMEFRAMES, 100, resample=config['RESAMPLE_HIGHER_TF'],
+                                               as_arrays=True, skip=cached)
+
+        # All audit rows of the cycle are committed in one transaction
+        with db.batch():
+            for symbol in symbols:
+                try:
+                    logging.info(f"🔍 Analyzing {symbol}...")
+                    with metrics.timer('analyze', symbol):
+                        analyze_symbol(symbol, market_data[symbol], collector, analyzer, ai_bot, db, metrics=metrics,
+                                       bar_cache=bar_cache, now_ms=now_ms, indicator_engine=indicator_engine)
+                except Exception as e:
+                    metrics.incr('symbol_errors')
+                    logging.error(f"❌ Error in {symbol}: {e}")
+            with metrics.timer('db_write'):
+                db.flush()
+        if bar_cache:
+            bar_cache.evict(now_ms)
+            bar_cache.save()
+        if indicator_engine:
+            indicator_engine.evict(now_ms)
+            indicator_engine.save()
+    finally:
+        collector.metrics = NULL_METRICS
+        report_cycle(metrics, db, config.get('METRICS_TEXTFILE_DIR'))
+
+def main():
+    config = build_config()
+    with startup_profile.stage('DataCollector()'):
+        collector = DataCollector(config)
+    with startup_profile.stage('TechnicalAnalysis()'):
+        analyzer = TechnicalAnalysis()
+    with startup_profile.stage('AIRegimeDetector()'):
+        ai_bot = AIRegimeDetector()
+    with startup_profile.stage('DatabaseManager()'):
+        db = DatabaseManager(config['DB_PATH'])
 
-            # Analyze Regimes
-            regimes, dfs = {}, {}
-            for tf, raw in tf_data.items():
-                df = analyzer.calculate_indicators(pd.DataFrame(raw, columns=['timestamp','open','high','low','close','volume']))
-                regimes[tf] = ai_bot.detect_regime(df)
-                dfs[tf] = df
-
-            row_1h = dfs['1h'].iloc[-1]
-            atr = row_1h['atr']
-            entry_price = row_1h['close']
-
-            # Check for ELITE Setup (Alignment + ADX > 25)
-            is_aligned = (regimes['1h'] == regimes['4h'] == regimes['1d'] == 'BULLISH')
-            is_strong = row_1h['adx'] > 25
-
-            if is_aligned and is_strong:
-                # Dynamic SL/TP Calculation
-                sl = entry_price - (1.5 * atr)
-                tp = entry_price + (3.0 * atr)
-                
-                status = "ELITE"
-                reason = "✅ Triple-Timeframe Bullish Alignment"
-                
-                # Send Enhanced Discord Alert
-                collector.send_formatted_alert(symbol, entry_price, sl, tp, row_1h['rsi'], row_1h['adx'])
-            else:
-                sl, tp = 0, 0
-                status = "REJECTED"
-                reason = f"Trend Gap or Weak ADX ({row_1h['adx']:.1f})"
-
-            db.save_signal(symbol, entry_price, regimes, row_1h, sl, tp, is_aligned, status, reason, pd.Timestamp.now().hour)
-
-        except Exception as e:
-            logging.error(f"❌ Error in {symbol}: {e}")
+    with startup_profile.stage('run_scan (incl. lazy exchange)'):
+        run_scan(config, collector, analyzer, ai_bot, db)
+    collector.close()
+    db.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,162 @@
+import os
+import time
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Upper bounds (seconds) of the exported latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PROMETHEUS_PREFIX = 'cryptobot'
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in [0, 100]) of an already sorted list."""
+    if not values:
+        return None
+    pos = (len(values) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def _summarize(values):
+    """(count, total, p50, p95, max) of a sorted, non-empty list of seconds."""
+    return len(values), sum(values), percentile(values, 50), percentile(values, 95), values[-1]
+
+
+class CycleMetrics:
+    def __init__(self, cycle, enabled=True):
+        """Collects stage timings and counters for one bot cycle (e.g. one scan or monitor pass).
+
+        Timers may be recorded from worker threads. A disabled instance records nothing, so
+        callers can always time their stages without checking whether anyone is listening.
+        """
+        self.cycle = cycle
+        self.enabled = enabled
+        self.started_at = datetime.now(timezone.utc)
+        self.duration = None
+        self._started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # (stage, symbol) -> [seconds]
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def timer(self, stage, symbol=None):
+        """Times the enclosed block as one sample of `stage` (per symbol when given)."""
+        if not self.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, symbol)
+
+    def observe(self, stage, seconds, symbol=None):
+        if self.enabled:
+            with self._lock:
+                self.samples[(stage, symbol)].append(seconds)
+
+    def incr(self, name, value=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] += value
+
+    def finish(self):
+        """Stops the cycle clock; returns the cycle duration in seconds."""
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._started
+        return self.duration
+
+    def _snapshot(self):
+        """Copies the samples and groups them per stage across symbols."""
+        with self._lock:
+            samples = {key: sorted(values) for key, values in self.samples.items()}
+            counters = sorted(self.counters.items())
+        by_stage = defaultdict(list)
+        for (stage, _), values in samples.items():
+            by_stage[stage].extend(values)
+        return samples, {stage: sorted(values) for stage, values in by_stage.items()}, counters
+
+    def stage_stats(self):
+        """{(stage, symbol): (count, total, p50, p95, max)}; symbol None holds the stage over all symbols."""
+        samples, by_stage, _ = self._snapshot()
+        stats = {(stage, None): _summarize(values) for stage, values in by_stage.items()}
+        stats.update({key: _summarize(values) for key, values in samples.items() if key[1] is not None})
+        return stats
+
+    def rows(self):
+        """Rows for the cycle_metrics table: the cycle itself, every stage, then the counters."""
+        started_at = self.started_at.strftime('%Y-%m-%d %H:%M:%S')
+        duration = self.finish()
+        rows = [(started_at, self.cycle, 'cycle', 'cycle', None, 1, duration, duration, duration, duration)]
+        for (stage, symbol), (count, total, p50, p95, peak) in sorted(
+                self.stage_stats().items(), key=lambda item: (item[0][0], item[0][1] or '')):
+            rows.append((started_at, self.cycle, 'stage', stage, symbol, count, total, p50, p95, peak))
+        for name, value in self._snapshot()[2]:
+            rows.append((started_at, self.cycle, 'counter', name, None, value, None, None, None, None))
+        return rows
+
+    def log_summary(self):
+        _, by_stage, counters = self._snapshot()
+        # Per-symbol stages run concurrently, so their p95 says more than the summed time
+        parts = [f"{stage} {sum(values):.2f}s" + (f" (n={len(values)}, p95 {percentile(values, 95):.2f}s)" if len(values) > 1 else "")
+                 for stage, values in sorted(by_stage.items())]
+        parts += [f"{name}={value}" for name, value in counters]
+        logging.info(f"⏱️ {self.cycle} cycle took {self.finish():.2f}s | " + (" | ".join(parts) or "no stages"))
+
+    def to_prometheus(self):
+        """Prometheus text exposition of this cycle: duration, per-stage histograms and counters."""
+        p = PROMETHEUS_PREFIX
+        label = f'cycle="{self.cycle}"'
+        lines = [
+            f"# HELP {p}_cycle_duration_seconds Wall time of the last cycle.",
+            f"# TYPE {p}_cycle_duration_seconds gauge",
+            f"{p}_cycle_duration_seconds{{{label}}} {self.finish():.6f}",
+            f"# HELP {p}_cycle_last_run_timestamp_seconds Start time of the last cycle.",
+            f"# TYPE {p}_cycle_last_run_timestamp_seconds gauge",
+            f"{p}_cycle_last_run_timestamp_seconds{{{label}}} {self.started_at.timestamp():.0f}",
+            f"# HELP {p}_stage_duration_seconds Stage latencies of the last cycle (all symbols).",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        _, by_stage, counters = self._snapshot()
+        for stage, values in sorted(by_stage.items()):
+            stage_label = f'{label},stage="{stage}"'
+            for bound in LATENCY_BUCKETS:
+                count = sum(1 for v in values if v <= bound)
+                lines.append(f'{p}_stage_duration_seconds_bucket{{{stage_label},le="{bound}"}} {count}')
+            lines.append(f'{p}_stage_duration_seconds_bucket{{{stage_label},le="+Inf"}} {len(values)}')
+            lines.append(f"{p}_stage_duration_seconds_sum{{{stage_label}}} {sum(values):.6f}")
+            lines.append(f"{p}_stage_duration_seconds_count{{{stage_label}}} {len(values)}")
+        lines += [
+            f"# HELP {p}_cycle_events Events counted during the last cycle (API calls, errors, alerts).",
+            f"# TYPE {p}_cycle_events gauge",
+        ]
+        for name, value in counters:
+            lines.append(f'{p}_cycle_events{{{label},event="{name}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, directory):
+        """Writes <directory>/cryptobot_<cycle>.prom atomically for node_exporter's textfile collector."""
+        path = os.path.join(directory, f"{PROMETHEUS_PREFIX}_{self.cycle}.prom")
+        tmp_path = path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"❌ Metrics textfile export failed: {e}")
+
+
+NULL_METRICS = CycleMetrics('disabled', enabled=False)
+
+
+def report_cycle(metrics, db, textfile_dir=None):
+    """Ends a cycle: logs the summary, stores it in cycle_metrics and optionally exports it."""
+    metrics.finish()
+    metrics.log_summary()
+    db.save_cycle_metrics(metrics.rows())
+    if textfile_dir:
+        metrics.write_textfile(textfile_dir)
@@ -1,87 +1,183 @@
+import startup_profile
+startup_profile.enable_if_requested()  # Must run before the heavy imports below
+
 import os
+import time
 import logging
-import sqlite3
-import pandas as pd
+from datetime import datetime, timezone
+import numpy as np
+from candle_store import timeframe_to_ms
+from candles import CandleArray
 from data_collection import DataCollector
 from database_manager import DatabaseManager
+from metrics import CycleMetrics, NULL_METRICS, report_cycle
+from outcome_engine import evaluate_outcomes
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def patch_db_manager(db_instance):
-    """Dynamically adds missing methods to DatabaseManager to avoid AttributeError."""
-    def get_open_signals():
-        try:
-            with sqlite3.connect(db_instance.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                cursor = conn.cursor()
-                # Targets 'ELITE' signals for performance tracking
-                cursor.execute("SELECT * FROM signals WHERE status = 'ELITE'")
-                return [dict(row) for row in cursor.fetchall()]
-        except Exception as e:
-            logging.error(f"❌ Monitor Patch Error (get_open_signals): {e}")
-            return []
-
-    def update_signal_status(signal_id, new_status, reason):
-        try:
-            with sqlite3.connect(db_instance.db_path) as conn:
-                conn.execute(
-                    "UPDATE signals SET status = ?, reason = ? WHERE id = ?",
-                    (new_status, reason, signal_id)
-                )
-                conn.commit()
-        except Exception as e:
-            logging.error(f"❌ Monitor Patch Error (update_status): {e}")
-
-    # Attach methods if they don't exist
-    if not hasattr(db_instance, 'get_open_signals'):
-        db_instance.get_open_signals = get_open_signals
-    if not hasattr(db_instance, 'update_signal_status'):
-        db_instance.update_signal_status = update_signal_status
+# Levels for positions logged before SL/TP were stored with the signal (percent from entry)
+FALLBACK_TP_PCT = 3.0
+FALLBACK_SL_PCT = 1.5
 
-def monitor_trades():
-    config = {
+# Venues only serve recent candles (Gate.io about 10k points back from now), so a checkpoint
+# further back than HISTORY_BARS candles is checked on the first coarser timeframe that reaches it
+HISTORY_BARS = 9_000
+COARSER_TIMEFRAMES = ('15m', '1h', '4h', '1d')
+
+def build_config():
+    """Reads the monitor settings from the environment."""
+    return {
         'BITGET_API_KEY': os.getenv('BITGET_API_KEY'),
         'BITGET_SECRET': os.getenv('BITGET_SECRET'),
         'BITGET_PASSWORD': os.getenv('BITGET_PASSWORD'),
         'GATEIO_API_KEY': os.getenv('GATEIO_API_KEY'),
         'GATEIO_SECRET': os.getenv('GATEIO_SECRET'),
         'DISCORD_WEBHOOK_URL': os.getenv('DISCORD_WEBHOOK_URL'),
-        'DB_PATH': os.getenv('DB_PATH', 'signals.db')
+        'DB_PATH': os.getenv('DB_PATH', 'signals.db'),
+        'METRICS_TEXTFILE_DIR': os.getenv('METRICS_TEXTFILE_DIR'),
+        'MONITOR_TIMEFRAME': os.getenv('MONITOR_TIMEFRAME', '5m'),
+        'HEDGED_FETCH': os.getenv('HEDGED_FETCH', 'false').lower() in ('1', 'true', 'yes')
     }
 
-    db = DatabaseManager(config['DB_PATH'])
-    patch_db_manager(db) # Apply the fix locally
-    
-    collector = DataCollector(config)
-    
-    # Verify Bitget connection directly
-    if not config['BITGET_API_KEY']:
-        logging.warning("⚠️ Monitor running without BITGET_API_KEY. Check workflow ENV.")
+def check_open_trades(db, collector, textfile_dir=None, timeframe='5m'):
+    """Runs one monitor pass over every open position with already-constructed clients."""
+    metrics = CycleMetrics('monitor')
+    collector.metrics = metrics
+    try:
+        _check_open_trades(db, collector, metrics, timeframe)
+    finally:
+        collector.metrics = NULL_METRICS
+        # Idle passes (no open trades) are not recorded, so they leave signals.db untouched
+        if metrics.samples:
+            report_cycle(metrics, db, textfile_dir)
+
+def trade_checkpoint(trade, timeframe):
+    """Open time (ms) of the first candle a position has not been checked against yet.
+
+    A new position starts at the first candle opening at or after the moment it was logged.
+    """
+    if trade.get('checkpoint_ts') is not None:
+        return int(trade['checkpoint_ts'])
+    logged = datetime.fromisoformat(str(trade['timestamp'])).replace(tzinfo=timezone.utc)
+    step = timeframe_to_ms(timeframe)
+    return -(-int(logged.timestamp() * 1000) // step) * step
+
+def fetch_plan(since, now_ms, timeframe, history_bars=HISTORY_BARS):
+    """(timeframe, since) to fetch from: `timeframe` if its history reaches `since`, else a coarser one.
+
+    If not even the coarsest reaches back that far, `since` is clamped to its oldest bar.
+    """
+    candidates = [timeframe] + [tf for tf in COARSER_TIMEFRAMES if timeframe_to_ms(tf) > timeframe_to_ms(timeframe)]
+    for candidate in candidates:
+        oldest = now_ms - (history_bars - 1) * timeframe_to_ms(candidate)
+        if since >= oldest:
+            return candidate, since
+    return candidate, oldest
+
+def trade_levels(trade):
+    """(take_profit, stop_loss) stored with the signal, or the fallback percentages around entry."""
+    entry = trade['price']
+    tp = trade.get('take_profit') or entry * (1 + FALLBACK_TP_PCT / 100)
+    sl = trade.get('stop_loss') or entry * (1 - FALLBACK_SL_PCT / 100)
+    return tp, sl
 
+def _check_open_trades(db, collector, metrics, timeframe='5m'):
     open_trades = db.get_open_signals()
     
     if not open_trades:
         logging.info("📝 No active ELITE signals to monitor.")
         return
 
+    # Every trade on a symbol is resolved from one fetch that starts at the oldest checkpoint
+    by_symbol = {}
     for trade in open_trades:
-        symbol = trade['symbol']
-        entry_price = trade['price']
-        
-        try:
-            ticker = collector.exchange.fetch_ticker(symbol)
-            current_price = ticker['last']
-            pnl = ((current_price - entry_price) / entry_price) * 100
-            
-            logging.info(f"📊 {symbol} | Entry: {entry_price} | Now: {current_price} | PnL: {pnl:.2f}%")
-            
-            if pnl >= 3.0:
-                db.update_signal_status(trade['id'], "TP_HIT", f"Gain: {pnl:.2f}%")
-            elif pnl <= -1.5:
-                db.update_signal_status(trade['id'], "SL_HIT", f"Loss: {pnl:.2f}%")
-                
-        except Exception as e:
-            logging.error(f"❌ Error checking {symbol}: {e}")
+        trade['checkpoint'] = trade_checkpoint(trade, timeframe)
+        by_symbol.setdefault(trade['symbol'], []).append(trade)
+    now_ms = int(time.time() * 1000)
+    plans = {}  # timeframe -> {symbol: since}
+    frames = {}  # symbol -> timeframe it is checked on this run
+    for symbol, trades in by_symbol.items():
+        oldest = min(trade['checkpoint'] for trade in trades)
+        frames[symbol], since = fetch_plan(oldest, now_ms, timeframe)
+        if frames[symbol] != timeframe:
+            logging.info(f"⏪ {symbol}: oldest checkpoint predates the {timeframe} history, checking on {frames[symbol]}")
+        plans.setdefault(frames[symbol], {})[symbol] = since
+    candles = {}
+    with metrics.timer('candles'):
+        for frame, starts in plans.items():
+            candles.update(collector.fetch_since(starts, frame))
+    metrics.incr('open_trades', len(open_trades))
+
+    # Status changes and checkpoints of the whole run are committed in one transaction
+    with db.batch():
+        for symbol, trades in by_symbol.items():
+            step = timeframe_to_ms(frames[symbol])
+            try:
+                if not candles.get(symbol):
+                    if min(trade['checkpoint'] for trade in trades) + step > now_ms:
+                        # Logged minutes ago: the first candle to check has not opened (or closed) yet
+                        logging.debug(f"{symbol}: no {frames[symbol]} candle since the position opened yet")
+                    else:
+                        logging.error(f"❌ Error checking {symbol}: no {frames[symbol]} candles available")
+                    continue
+                _resolve_symbol(db, symbol, trades, CandleArray.from_ohlcv(candles[symbol]), step, now_ms)
+            except Exception as e:
+                metrics.incr('symbol_errors')
+                logging.error(f"❌ Error checking {symbol}: {e}")
+        with metrics.timer('db_write'):
+            db.flush()
+
+def _resolve_symbol(db, symbol, trades, candles, step, now_ms):
+    """First-touch TP/SL for every open trade on one symbol in a single vectorized pass.
+
+    Each trade is checked from its own checkpoint through the newest candle. The forming
+    candle counts for touches but is checked again next run, so checkpoints only move past
+    closed candles. When one candle touches both levels TP wins, the order the old
+    last-price check used.
+    """
+    timestamps = candles.timestamps
+    levels = np.array([trade_levels(trade) for trade in trades], dtype=np.float64).reshape(-1, 2)
+    entries = np.array([trade['price'] for trade in trades], dtype=np.float64)
+    graded = evaluate_outcomes(timestamps, candles.high, candles.low, candles.close,
+                               [trade['checkpoint'] for trade in trades], np.ones(len(trades), dtype=bool),
+                               entries, levels[:, 0], levels[:, 1], horizon=len(candles))
+
+    last_open = int(timestamps[-1])
+    next_checkpoint = last_open if last_open + step > now_ms else last_open + step
+    checkpoints = {}
+    for i, trade in enumerate(trades):
+        outcome = graded['outcome'][i]
+        if outcome in ('WIN', 'LOSS'):
+            hit_ms = trade['checkpoint'] + graded['time_to_hit_ms'][i]
+            hit_at = time.strftime('%Y-%m-%d %H:%M UTC', time.gmtime(hit_ms / 1000))
+            level = levels[i, 0] if outcome == 'WIN' else levels[i, 1]
+            pnl = (level - entries[i]) / entries[i] * 100
+            logging.info(f"📊 {symbol} | Entry: {entries[i]} | Level: {level:g} touched {hit_at} | PnL: {pnl:.2f}%")
+            if outcome == 'WIN':
+                db.update_signal_status(trade['id'], "TP_HIT", f"Gain: {pnl:.2f}% at {hit_at}")
+            else:
+                db.update_signal_status(trade['id'], "SL_HIT", f"Loss: {pnl:.2f}% at {hit_at}")
+        elif next_checkpoint > trade['checkpoint']:
+            checkpoints[trade['id']] = next_checkpoint
+    if checkpoints:
+        db.advance_checkpoints(checkpoints)
+
+def monitor_trades():
+    config = build_config()
+    with startup_profile.stage('DatabaseManager()'):
+        db = DatabaseManager(config['DB_PATH'])
+    
+    with startup_profile.stage('DataCollector()'):
+        collector = DataCollector(config)
+    
+    # Verify Bitget connection directly
+    if not config['BITGET_API_KEY']:
+        logging.warning("⚠️ Monitor running without BITGET_API_KEY. Check workflow ENV.")
+
+    with startup_profile.stage('check_open_trades (incl. lazy exchange)'):
+        check_open_trades(db, collector, config['METRICS_TEXTFILE_DIR'], config['MONITOR_TIMEFRAME'])
+    collector.close()
+    db.close()
 
 if __name__ == "__main__":
     monitor_trades()
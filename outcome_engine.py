@@ -0,0 +1,109 @@
+import numpy as np
+
+OUTCOME_LABELS = np.array(['EXPIRED', 'WIN', 'LOSS', 'AMBIGUOUS'], dtype=object)
+CHUNK_SIZE = 32_768  # Signals evaluated per block, keeps the (signals x horizon) matrices small
+
+
+def evaluate_outcomes(candle_times, highs, lows, closes, entry_times, directions, entries, tps, sls,
+                      horizon=48, same_bar='TP'):
+    """Resolves first-touch TP/SL outcomes for a whole batch of signals against one candle series.
+
+    Each signal's window starts at the first candle whose open time is >= its entry time and spans
+    `horizon` candles, exactly like the per-signal `fetch_ohlcv(since=..., limit=horizon)` path.
+    BULLISH signals win on high >= TP and lose on low <= SL; every other direction is treated as
+    BEARISH (low <= TP wins, high >= SL loses), mirroring Backtester._evaluate_signal.
+
+    `same_bar` decides candles that touch both levels: 'TP' (the legacy loop's order), 'SL'
+    (conservative) or 'AMBIGUOUS' (reported separately).
+
+    Returns a dict of arrays: outcome (labels), bar_index (-1 if nothing hit), time_to_hit_ms
+    (NaN if nothing hit), r_multiple and both_touched.
+    """
+    if same_bar not in ('TP', 'SL', 'AMBIGUOUS'):
+        raise ValueError(f"Unknown same_bar policy: {same_bar}")
+
+    candle_times = np.asarray(candle_times, dtype=np.int64)
+    highs = np.asarray(highs, dtype=np.float64)
+    lows = np.asarray(lows, dtype=np.float64)
+    closes = np.asarray(closes, dtype=np.float64)
+    entry_times = np.asarray(entry_times, dtype=np.int64)
+    entries = np.asarray(entries, dtype=np.float64)
+    tps = np.asarray(tps, dtype=np.float64)
+    sls = np.asarray(sls, dtype=np.float64)
+    directions = np.asarray(directions)
+    bullish = directions if directions.dtype == bool else directions == 'BULLISH'
+
+    n = len(entry_times)
+    result = {
+        'outcome': np.empty(n, dtype=object),
+        'bar_index': np.full(n, -1, dtype=np.int64),
+        'time_to_hit_ms': np.full(n, np.nan),
+        'r_multiple': np.full(n, np.nan),
+        'both_touched': np.zeros(n, dtype=bool),
+    }
+    if n == 0:
+        return result
+    if len(candle_times) == 0:
+        result['outcome'][:] = 'EXPIRED'
+        return result
+
+    offsets = np.arange(horizon)
+    for lo in range(0, n, CHUNK_SIZE):
+        hi = min(lo + CHUNK_SIZE, n)
+        _evaluate_chunk(result, slice(lo, hi), offsets, candle_times, highs, lows, closes,
+                        entry_times[lo:hi], bullish[lo:hi], entries[lo:hi], tps[lo:hi], sls[lo:hi], same_bar)
+    return result
+
+
+def _evaluate_chunk(result, rows, offsets, candle_times, highs, lows, closes,
+                    entry_times, bullish, entries, tps, sls, same_bar):
+    """Fills `result[rows]` for one block of signals."""
+    last = len(candle_times) - 1
+    start = np.searchsorted(candle_times, entry_times, side='left')
+    idx = start[:, None] + offsets[None, :]
+    in_range = idx <= last
+    idx = np.minimum(idx, last)
+
+    window_high = highs[idx]
+    window_low = lows[idx]
+    bull = bullish[:, None]
+    tp_hit = np.where(bull, window_high >= tps[:, None], window_low <= tps[:, None]) & in_range
+    sl_hit = np.where(bull, window_low <= sls[:, None], window_high >= sls[:, None]) & in_range
+
+    touched = tp_hit | sl_hit
+    has_hit = touched.any(axis=1)
+    first = touched.argmax(axis=1)
+    k = np.arange(len(first))
+    tp_first = tp_hit[k, first] & has_hit
+    sl_first = sl_hit[k, first] & has_hit
+    both = tp_first & sl_first
+
+    codes = np.zeros(len(first), dtype=np.int64)  # EXPIRED
+    if same_bar == 'TP':
+        codes[tp_first] = 1
+        codes[sl_first & ~tp_first] = 2
+    elif same_bar == 'SL':
+        codes[sl_first] = 2
+        codes[tp_first & ~sl_first] = 1
+    else:
+        codes[tp_first & ~both] = 1
+        codes[sl_first & ~both] = 2
+        codes[both] = 3
+
+    hit_idx = idx[k, first]
+    sign = np.where(bullish, 1.0, -1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        risk = np.abs(entries - sls)
+        reward = np.abs(tps - entries) / risk
+        # Expired trades are marked to the close of the last candle inside their window
+        n_valid = in_range.sum(axis=1)
+        last_idx = np.minimum(start + np.maximum(n_valid - 1, 0), last)
+        drift = sign * (closes[last_idx] - entries) / risk
+    r = np.where(codes == 1, reward, np.where(codes == 2, -1.0, np.where(codes == 3, np.nan, drift)))
+    r[(codes == 0) & (n_valid == 0)] = np.nan
+
+    result['outcome'][rows] = OUTCOME_LABELS[codes]
+    result['bar_index'][rows] = np.where(has_hit, first, -1)
+    result['time_to_hit_ms'][rows] = np.where(has_hit, candle_times[hit_idx] - entry_times, np.nan)
+    result['r_multiple'][rows] = r
+    result['both_touched'][rows] = both
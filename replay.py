@@ -0,0 +1,213 @@
+import os
+import time
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+import main as scanner
+from candles import CandleArray
+from candle_store import CandleStore, timeframe_to_ms
+from candle_archive import CandleArchive
+from technical_analysis import TechnicalAnalysis
+from ai_regime import AIRegimeDetector, regime_series, SMA_LENGTH
+from outcome_engine import evaluate_outcomes
+from backtester import HORIZON_CANDLES, max_drawdown
+
+HOUR_MS = timeframe_to_ms('1h')
+RESULT_COLUMNS = ['symbol', 'ts_ms', 'price', 'regime_1d', 'regime_4h', 'regime_1h', 'rsi', 'adx', 'atr',
+                  'stop_loss', 'take_profit', 'outcome', 'r_multiple', 'bars_to_hit']
+
+
+class SignalReplay:
+    def __init__(self, analyzer=None, ai_bot=None, horizon=HORIZON_CANDLES, same_bar='TP', window=100):
+        """Replays the scanner's ELITE rule over stored 1h history and grades every signal it fires.
+
+        Each closed 1h bar is evaluated the way the streaming runner sees it on close: 1h/4h/1d
+        regimes with the forming higher-timeframe bar, 1h ADX above main.ADX_THRESHOLD and ATR
+        SL/TP levels from main's multipliers. Signals are graded on the following candles with
+        the first-touch engine. `window` is the candle count main.py analyzes per timeframe.
+        """
+        self.analyzer = analyzer or TechnicalAnalysis()
+        self.ai_bot = ai_bot
+        self.horizon = horizon
+        self.same_bar = same_bar
+        self.window = window
+
+    def replay(self, symbol, candles):
+        """Vectorized block replay of one symbol: indicators, regimes and levels for all bars at once.
+
+        Indicators come from calculate_indicators over the whole history, so RSI/ADX are the
+        converged values rather than those of a 100-candle window; use replay_bars to compare.
+        """
+        candles = CandleArray.from_ohlcv(candles)
+        if len(candles) <= SMA_LENGTH:
+            return self._empty()
+        df = self.analyzer.calculate_indicators(candles.to_frame())
+        if df is None:
+            return self._empty()
+        timestamps, closes = candles.timestamps, candles.close
+        regimes = {tf: regime_series(timestamps, closes, tf) for tf in scanner.TIMEFRAMES}
+        rsi, adx, atr = (df[column].to_numpy(dtype=np.float64) for column in ('rsi', 'adx', 'atr'))
+
+        aligned = np.logical_and.reduce([regimes[tf] == 'BULLISH' for tf in scanner.TIMEFRAMES])
+        bars = np.flatnonzero(aligned & (adx > scanner.ADX_THRESHOLD) & np.isfinite(atr))
+        entries = closes[bars]
+        return self._grade(symbol, candles, bars, {
+            'price': entries,
+            **{f'regime_{tf}': regimes[tf][bars] for tf in scanner.TIMEFRAMES},
+            'rsi': rsi[bars], 'adx': adx[bars], 'atr': atr[bars],
+            'stop_loss': entries - scanner.SL_ATR_MULTIPLIER * atr[bars],
+            'take_profit': entries + scanner.TP_ATR_MULTIPLIER * atr[bars],
+        })
+
+    def replay_bars(self, symbol, candles):
+        """Event-driven replay: feeds every closed bar's windows through main.analyze_symbol.
+
+        Slower than replay() but runs the scanner's own code path on exactly the candles a live
+        scan would have fetched, which makes it the reference for checking the block replay.
+        """
+        candles = CandleArray.from_ohlcv(candles)
+        ai_bot = self.ai_bot or AIRegimeDetector()
+        span = {tf: (self.window + 1) * timeframe_to_ms(tf) // HOUR_MS for tf in scanner.TIMEFRAMES}
+        bars, decisions = [], []
+        for t in range(SMA_LENGTH, len(candles)):
+            tf_data = {}
+            for tf in scanner.TIMEFRAMES:
+                history = CandleArray(candles.data[:, max(0, t + 1 - span[tf]):t + 1])
+                tf_data[tf] = (history if tf == '1h' else history.resample(tf)).tail(self.window)
+            hour = time.gmtime((candles.data[0, t] + HOUR_MS) / 1000).tm_hour
+            decision = scanner.analyze_symbol(symbol, tf_data, None, self.analyzer, ai_bot, None, hour_of_day=hour)
+            if decision and decision['status'] == 'ELITE':
+                bars.append(t)
+                decisions.append(decision)
+
+        return self._grade(symbol, candles, np.array(bars, dtype=np.int64), {
+            'price': np.array([d['price'] for d in decisions], dtype=np.float64),
+            **{f'regime_{tf}': np.array([d['regimes'][tf] for d in decisions], dtype=object)
+               for tf in scanner.TIMEFRAMES},
+            **{key: np.array([d['row'][key] for d in decisions], dtype=np.float64) for key in ('rsi', 'adx', 'atr')},
+            'stop_loss': np.array([d['stop_loss'] for d in decisions], dtype=np.float64),
+            'take_profit': np.array([d['take_profit'] for d in decisions], dtype=np.float64),
+        })
+
+    def run(self, histories, bar_by_bar=False):
+        """Replays {symbol: candles} and returns every graded ELITE signal as one DataFrame."""
+        frames = []
+        for symbol, candles in histories.items():
+            replay = self.replay_bars if bar_by_bar else self.replay
+            frames.append(replay(symbol, candles))
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return self._empty()
+        return pd.concat(frames, ignore_index=True).sort_values(['ts_ms', 'symbol'], kind='stable', ignore_index=True)
+
+    def _grade(self, symbol, candles, bars, columns):
+        """Grades signals taken on the close of `bars`, starting with the next candle."""
+        timestamps = candles.timestamps
+        entry_times = timestamps[bars]
+        graded = evaluate_outcomes(timestamps, candles.high, candles.low, candles.close, entry_times + HOUR_MS,
+                                   np.ones(len(bars), dtype=bool), columns['price'], columns['take_profit'],
+                                   columns['stop_loss'], horizon=self.horizon, same_bar=self.same_bar)
+        return pd.DataFrame({
+            'symbol': symbol,
+            'ts_ms': entry_times,
+            **columns,
+            'outcome': graded['outcome'],
+            'r_multiple': graded['r_multiple'],
+            'bars_to_hit': graded['bar_index'],
+        }, columns=RESULT_COLUMNS)
+
+    @staticmethod
+    def _empty():
+        return pd.DataFrame(columns=RESULT_COLUMNS)
+
+
+def summarize(signals):
+    """Per-symbol and overall win rate, expectancy and drawdown of a replay result."""
+    rows = []
+    groups = list(signals.groupby('symbol')) + [('ALL', signals)]
+    for symbol, group in groups:
+        wins = int((group['outcome'] == 'WIN').sum())
+        losses = int((group['outcome'] == 'LOSS').sum())
+        r = group['r_multiple'].to_numpy(dtype=np.float64)
+        r = r[~np.isnan(r)]
+        rows.append({
+            'symbol': symbol,
+            'signals': len(group),
+            'wins': wins,
+            'losses': losses,
+            'expired': int((group['outcome'] == 'EXPIRED').sum()),
+            'win_rate': wins / (wins + losses) * 100 if wins + losses else 0.0,
+            'expectancy': float(r.mean()) if len(r) else float('nan'),
+            'max_drawdown': max_drawdown(r),
+        })
+    return rows
+
+
+def print_summary(rows):
+    print("\n" + "=" * 30)
+    print("🎞️ REPLAY PERFORMANCE REPORT")
+    print("=" * 30)
+    print(f"{'symbol':<12} {'signals':>8} {'wins':>6} {'losses':>7} {'expired':>8} {'win%':>7} {'exp(R)':>8} {'maxDD(R)':>9}")
+    for row in rows:
+        print(f"{row['symbol']:<12} {row['signals']:>8} {row['wins']:>6} {row['losses']:>7} {row['expired']:>8} "
+              f"{row['win_rate']:>6.1f}% {row['expectancy']:>+8.3f} {row['max_drawdown']:>9.1f}")
+    print("=" * 30)
+
+
+def load_histories(store, exchange_id, symbols, days):
+    """Reads `days` of stored 1h candles per symbol (no API calls).
+
+    `store` is a CandleStore or a CandleArchive; the archive returns zero-copy memmap views.
+    """
+    since = int(time.time() * 1000) - days * 24 * HOUR_MS
+    histories = {}
+    for symbol in symbols:
+        candles = store.load(exchange_id, symbol, '1h', since=since)
+        if len(candles):
+            histories[symbol] = candles
+        else:
+            logging.warning(f"⚠️ No stored 1h candles for {symbol} on {exchange_id}.")
+    return histories
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replays the ELITE rule over stored candles and grades the signals.")
+    parser.add_argument('--symbols', help="Comma-separated symbols (default: the scanner's list)")
+    parser.add_argument('--days', type=int, default=365, help="Days of stored 1h history to replay")
+    parser.add_argument('--exchange', default='gateio', help="Exchange id the candles were stored under")
+    parser.add_argument('--candle-db', default=os.getenv('CANDLE_DB_PATH', 'candles.db'))
+    parser.add_argument('--archive', default=os.getenv('CANDLE_ARCHIVE_DIR'),
+                        help="Read candles from this memory-mapped archive instead of the candle store")
+    parser.add_argument('--bar-by-bar', action='store_true',
+                        help="Drive main.analyze_symbol on every bar instead of the vectorized replay")
+    parser.add_argument('--same-bar', default='TP', choices=['TP', 'SL', 'AMBIGUOUS'])
+    parser.add_argument('--out', help="Write the graded signals to this CSV file")
+    args = parser.parse_args(argv)
+
+    symbols = [s.strip() for s in args.symbols.split(',')] if args.symbols else scanner.SYMBOLS
+    if args.archive:
+        histories = load_histories(CandleArchive(args.archive), args.exchange, symbols, args.days)
+    else:
+        store = CandleStore(args.candle_db)
+        try:
+            histories = load_histories(store, args.exchange, symbols, args.days)
+        finally:
+            store.close()
+    if not histories:
+        print("🚫 No stored candles to replay. Run the scanner or backtester with CANDLE_DB_PATH first.")
+        return 1
+
+    started = time.perf_counter()
+    signals = SignalReplay(same_bar=args.same_bar).run(histories, bar_by_bar=args.bar_by_bar)
+    bars = sum(len(candles) for candles in histories.values())
+    print(f"⏱️ Replayed {bars} bars of {len(histories)} symbols in {time.perf_counter() - started:.2f}s.")
+    print_summary(summarize(signals))
+    if args.out:
+        signals.to_csv(args.out, index=False)
+        print(f"💾 Wrote {len(signals)} signals to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,255 @@
+import os
+import glob
+import time
+import logging
+import argparse
+import sqlite3
+from database_manager import connect_sqlite, OPEN_STATUS
+
+# Daily totals per symbol and status; aged out after `rollup_days`
+ROLLUP_SQL = '''
+    INSERT INTO signal_rollups (symbol, day, status, signals, aligned, rsi_sum, adx_sum, atr_sum)
+    SELECT COALESCE(symbol, ''), date(timestamp), COALESCE(status, 'UNKNOWN'),
+           COUNT(*), TOTAL(is_aligned), TOTAL(rsi), TOTAL(adx), TOTAL(atr)
+    FROM signals WHERE id IN (SELECT id FROM temp.moving)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (symbol, day, status) DO UPDATE SET
+        signals = signals + excluded.signals,
+        aligned = aligned + excluded.aligned,
+        rsi_sum = rsi_sum + excluded.rsi_sum,
+        adx_sum = adx_sum + excluded.adx_sum,
+        atr_sum = atr_sum + excluded.atr_sum
+'''
+# All-time counts per symbol, hour of day and status: at most symbols x 24 x statuses rows
+HOUR_ROLLUP_SQL = '''
+    INSERT INTO signal_hour_rollups (symbol, hour_of_day, status, signals, aligned)
+    SELECT COALESCE(symbol, ''), COALESCE(hour_of_day, -1), COALESCE(status, 'UNKNOWN'),
+           COUNT(*), TOTAL(is_aligned)
+    FROM signals WHERE id IN (SELECT id FROM temp.moving)
+    GROUP BY 1, 2, 3
+    ON CONFLICT (symbol, hour_of_day, status) DO UPDATE SET
+        signals = signals + excluded.signals,
+        aligned = aligned + excluded.aligned
+'''
+
+
+def archive_path(archive_dir, month):
+    """Monthly archive file for a 'YYYY_MM' month key."""
+    return os.path.join(archive_dir, f"signals_{month}.db")
+
+
+def open_history(db_path='signals.db', archive_dir='signal_archive', months=None):
+    """A connection to the hot DB with the newest monthly archives attached.
+
+    The temporary view `all_signals` spans the hot `signals` table and every attached
+    archive. `months` limits how many archives are attached (newest first); SQLite caps the
+    number of attached databases, so older months are skipped beyond that limit.
+    """
+    conn = sqlite3.connect(db_path)
+    limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+    paths = sorted(glob.glob(os.path.join(archive_dir, "signals_*.db")), reverse=True)
+    paths = paths[:min(limit, months or limit)]
+    columns = [col[1] for col in conn.execute("PRAGMA table_info(signals)")]
+    selects = [f"SELECT {', '.join(columns)} FROM main.signals"]
+    for i, path in enumerate(paths):
+        schema = f"archive_{i}"
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        archived = {col[1] for col in conn.execute(f"PRAGMA {schema}.table_info(signals)")}
+        selects.append(f"SELECT {', '.join(c if c in archived else 'NULL' for c in columns)} FROM {schema}.signals")
+    conn.execute(f"CREATE TEMP VIEW all_signals AS {' UNION ALL '.join(selects)}")
+    return conn
+
+
+class SignalRetention:
+    def __init__(self, db_path='signals.db', archive_dir='signal_archive', hot_days=30, metrics_days=30,
+                 vacuum_days=7, vacuum_free_ratio=0.25, rollup_days=365):
+        """Keeps signals.db small: recent raw rows stay hot, older ones are rolled up and archived.
+
+        Rows older than `hot_days` are counted into `signal_rollups` (per symbol, day and status,
+        kept for `rollup_days`) and `signal_hour_rollups` (per symbol, hour_of_day and status,
+        kept forever but bounded in size), then moved to monthly `signals_YYYY_MM.db` files under
+        `archive_dir`, which open_history() attaches on demand. Open ELITE positions are never
+        moved, whatever their age. cycle_metrics rows older than `metrics_days` are dropped. The
+        hot file is vacuumed every `vacuum_days`, or sooner once a `vacuum_free_ratio` share of
+        its pages is free.
+        """
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.hot_days = hot_days
+        self.metrics_days = metrics_days
+        self.vacuum_days = vacuum_days
+        self.vacuum_free_ratio = vacuum_free_ratio
+        self.rollup_days = rollup_days
+        self._conn = connect_sqlite(db_path)
+        self._init_db()
+
+    def _init_db(self):
+        with self._conn:
+            columns = [col[1] for col in self._conn.execute("PRAGMA table_info(signal_rollups)")]
+            if 'hour_of_day' in columns:
+                # First layout keyed rollups by hour too, which saved almost nothing: fold it into the new tables
+                self._conn.execute("ALTER TABLE signal_rollups RENAME TO signal_rollups_hourly")
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS signal_rollups (
+                    symbol TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    signals INTEGER NOT NULL,
+                    aligned INTEGER NOT NULL,
+                    rsi_sum REAL NOT NULL,
+                    adx_sum REAL NOT NULL,
+                    atr_sum REAL NOT NULL,
+                    PRIMARY KEY (symbol, day, status)
+                ) WITHOUT ROWID
+            ''')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS signal_hour_rollups (
+                    symbol TEXT NOT NULL,
+                    hour_of_day INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    signals INTEGER NOT NULL,
+                    aligned INTEGER NOT NULL,
+                    PRIMARY KEY (symbol, hour_of_day, status)
+                ) WITHOUT ROWID
+            ''')
+            if 'hour_of_day' in columns:
+                self._conn.execute('''
+                    INSERT INTO signal_rollups (symbol, day, status, signals, aligned, rsi_sum, adx_sum, atr_sum)
+                    SELECT symbol, day, status, SUM(signals), SUM(aligned), SUM(rsi_sum), SUM(adx_sum), SUM(atr_sum)
+                    FROM signal_rollups_hourly GROUP BY symbol, day, status
+                ''')
+                self._conn.execute('''
+                    INSERT INTO signal_hour_rollups (symbol, hour_of_day, status, signals, aligned)
+                    SELECT symbol, hour_of_day, status, SUM(signals), SUM(aligned)
+                    FROM signal_rollups_hourly GROUP BY symbol, hour_of_day, status
+                ''')
+                self._conn.execute("DROP TABLE signal_rollups_hourly")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS maintenance (key TEXT PRIMARY KEY, value TEXT)")
+
+    def run(self):
+        """Applies the whole policy once; returns the rows archived and pruned and whether it vacuumed."""
+        archived = sum(self.archive_month(month) for month in self.movable_months())
+        metrics_pruned = self.prune_metrics()
+        rollups_pruned = self.prune_rollups()
+        vacuumed = self.vacuum_if_due()
+        return {'archived': archived, 'metrics_pruned': metrics_pruned, 'rollups_pruned': rollups_pruned,
+                'vacuumed': vacuumed}
+
+    def _movable(self):
+        return (f"timestamp < datetime('now', '-{int(self.hot_days)} days') "
+                f"AND status IS NOT '{OPEN_STATUS}'")
+
+    def movable_months(self):
+        rows = self._conn.execute(
+            f"SELECT DISTINCT strftime('%Y_%m', timestamp) FROM signals WHERE {self._movable()} ORDER BY 1"
+        ).fetchall()
+        return [row[0] for row in rows if row[0]]
+
+    def archive_month(self, month):
+        """Copies one month of movable rows to its archive file, then rolls them up and deletes them.
+
+        The archive commit comes first and keeps row ids, so a run interrupted in between only
+        repeats work (INSERT OR IGNORE) instead of losing or double-counting rows.
+        """
+        cursor = self._conn.execute(
+            f"SELECT * FROM signals WHERE {self._movable()} AND strftime('%Y_%m', timestamp) = ?", (month,)
+        )
+        columns = [col[0] for col in cursor.description]
+        rows = cursor.fetchall()
+        if not rows:
+            return 0
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        archive = sqlite3.connect(archive_path(self.archive_dir, month))
+        try:
+            with archive:
+                schema = self._conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'signals'").fetchone()[0]
+                archive.execute(schema.replace("CREATE TABLE signals", "CREATE TABLE IF NOT EXISTS signals", 1))
+                existing = {col[1] for col in archive.execute("PRAGMA table_info(signals)")}
+                for column in columns:
+                    if column not in existing:
+                        archive.execute(f"ALTER TABLE signals ADD COLUMN {column}")
+                archive.executemany(
+                    f"INSERT OR IGNORE INTO signals ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                    rows
+                )
+        finally:
+            archive.close()
+
+        id_index = columns.index('id')
+        with self._conn:
+            self._conn.execute("CREATE TEMP TABLE IF NOT EXISTS moving (id INTEGER PRIMARY KEY)")
+            self._conn.execute("DELETE FROM temp.moving")
+            self._conn.executemany("INSERT INTO temp.moving (id) VALUES (?)", [(row[id_index],) for row in rows])
+            self._conn.execute(ROLLUP_SQL)
+            self._conn.execute(HOUR_ROLLUP_SQL)
+            self._conn.execute("DELETE FROM signals WHERE id IN (SELECT id FROM temp.moving)")
+            self._conn.execute("DELETE FROM temp.moving")
+        logging.info(f"🗄️ Archived {len(rows)} signals from {month.replace('_', '-')}.")
+        return len(rows)
+
+    def prune_metrics(self):
+        try:
+            with self._conn:
+                return self._conn.execute(
+                    f"DELETE FROM cycle_metrics WHERE started_at < datetime('now', '-{int(self.metrics_days)} days')"
+                ).rowcount
+        except sqlite3.OperationalError:
+            return 0  # Database predates the cycle_metrics table
+
+    def prune_rollups(self):
+        """Drops daily rollups older than `rollup_days`; the raw rows remain in the monthly archives."""
+        with self._conn:
+            return self._conn.execute(
+                f"DELETE FROM signal_rollups WHERE day < date('now', '-{int(self.rollup_days)} days')"
+            ).rowcount
+
+    def vacuum_if_due(self):
+        """VACUUMs when the last one is `vacuum_days` old or too many pages are free."""
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        row = self._conn.execute("SELECT value FROM maintenance WHERE key = 'last_vacuum'").fetchone()
+        last_vacuum = float(row[0]) if row else 0.0
+        overdue = time.time() - last_vacuum >= self.vacuum_days * 86400
+        if not overdue and free_pages < page_count * self.vacuum_free_ratio:
+            return False
+        self._conn.execute("VACUUM")
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO maintenance (key, value) VALUES ('last_vacuum', ?)",
+                               (str(time.time()),))
+        logging.info(f"🧹 Vacuumed {self.db_path} ({free_pages} of {page_count} pages were free).")
+        return True
+
+    def close(self):
+        """Folds the WAL back into the main file so the committed signals.db is self-contained."""
+        try:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        finally:
+            self._conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolls up and archives old signals to keep signals.db small.")
+    parser.add_argument('--db', default=os.getenv('DB_PATH', 'signals.db'))
+    parser.add_argument('--archive-dir', default=os.getenv('SIGNAL_ARCHIVE_DIR', 'signal_archive'))
+    parser.add_argument('--hot-days', type=int, default=int(os.getenv('SIGNAL_HOT_DAYS', 30)))
+    parser.add_argument('--metrics-days', type=int, default=int(os.getenv('METRICS_RETENTION_DAYS', 30)))
+    parser.add_argument('--rollup-days', type=int, default=int(os.getenv('SIGNAL_ROLLUP_DAYS', 365)))
+    parser.add_argument('--vacuum-days', type=float, default=7)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    retention = SignalRetention(args.db, args.archive_dir, args.hot_days, args.metrics_days, args.vacuum_days,
+                                rollup_days=args.rollup_days)
+    try:
+        result = retention.run()
+    finally:
+        retention.close()
+    logging.info(f"✅ Retention done: {result['archived']} signals archived, "
+                 f"{result['metrics_pruned']} metric and {result['rollups_pruned']} rollup rows pruned, vacuum {'run' if result['vacuumed'] else 'skipped'}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,18 +1,19 @@
-import pandas as pd
-import pandas_ta_classic as ta
+import numpy as np
+
+SWING_LOOKBACK = 20  # Candles searched for the swing low/high the stop sits behind
 
 class RiskManagement:
     @staticmethod
     def calculate_sl_tp(df, side, entry_price):
-        # ATR for dynamic stop logic
-        atr_series = ta.atr(df['high'], df['low'], df['close'], length=14)
-        atr = atr_series.iloc[-1] if atr_series is not None else 0
+        """Swing-based SL with a 2R target; `df` may be a DataFrame or a CandleArray."""
+        if len(df) < SWING_LOOKBACK:
+            return float('nan'), float('nan')
 
         if side == 'LONG':
-            sl = df['low'].rolling(20).min().iloc[-1]
+            sl = np.asarray(df['low'], dtype=np.float64)[-SWING_LOOKBACK:].min()
             tp = entry_price + 2 * (entry_price - sl)
         else:
-            sl = df['high'].rolling(20).max().iloc[-1]
+            sl = np.asarray(df['high'], dtype=np.float64)[-SWING_LOOKBACK:].max()
             tp = entry_price - 2 * (sl - entry_price)
         
         return float(sl), float(tp)
@@ -0,0 +1,103 @@
+import logging
+import numpy as np
+from metrics import NULL_METRICS
+
+
+def usdt_spot_symbols(markets, quote='USDT'):
+    """Active spot symbols quoted in `quote` from a ccxt markets dict, sorted by name."""
+    return sorted(
+        symbol for symbol, market in markets.items()
+        if market.get('spot') and market.get('quote') == quote and market.get('active') is not False
+    )
+
+
+def sma_trend_mask(closes, length=20):
+    """Row-wise `close > SMA(length)` on the last column of a (symbols x bars) close matrix.
+
+    It is the same test AIRegimeDetector.detect_regime applies to one symbol, evaluated for the
+    whole universe at once.
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    return closes[:, -1] > closes[:, -length:].mean(axis=1)
+
+
+def quote_volume_mask(closes, volumes, floor, length=20):
+    """Row-wise mean quote volume (close x base volume) over the last `length` bars >= floor."""
+    closes = np.asarray(closes, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    return (closes[:, -length:] * volumes[:, -length:]).mean(axis=1) >= floor
+
+
+class UniverseScreener:
+    def __init__(self, collector, min_quote_volume=1_000_000, timeframe='1d', sma_length=20,
+                 max_symbols=None, quote='USDT'):
+        """Cheap first pass over every `quote` spot market before the full per-symbol pipeline.
+
+        Stage 1 keeps markets whose 24h quote volume (one bulk ticker call) clears the floor.
+        Stage 2 fetches `sma_length` bars of `timeframe` for those markets and keeps the ones
+        trading above their SMA in one vectorized pass. A symbol failing that filter on 1d would
+        be rejected by the triple-timeframe alignment anyway, so only survivors get the full
+        analysis. `max_symbols` caps the survivors, most liquid first.
+        """
+        self.collector = collector
+        self.min_quote_volume = min_quote_volume
+        self.timeframe = timeframe
+        self.sma_length = sma_length
+        self.max_symbols = max_symbols
+        self.quote = quote
+
+    def universe(self):
+        exchange = self.collector.exchange
+        if not exchange:
+            return []
+        return usdt_spot_symbols(exchange.load_markets(), self.quote)
+
+    def volume_pass(self, symbols):
+        """Returns (symbols above the volume floor by descending volume, whether tickers were used).
+
+        Without a ticker snapshot every symbol passes and the floor is applied to candle volume later.
+        """
+        tickers = self.collector.fetch_tickers()
+        if not tickers:
+            return symbols, False
+        volumes = {
+            symbol: tickers[symbol].get('quoteVolume') or 0.0
+            for symbol in symbols if symbol in tickers
+        }
+        kept = [symbol for symbol, volume in volumes.items() if volume >= self.min_quote_volume]
+        return sorted(kept, key=lambda s: volumes[s], reverse=True), True
+
+    def trend_pass(self, symbols, check_volume=False):
+        """Keeps the symbols whose last close is above their SMA, in the order given.
+
+        With `check_volume`, the volume floor is applied to the candles too and survivors are
+        ordered by their mean quote volume instead.
+        """
+        data = self.collector.fetch_many(symbols, [self.timeframe], self.sma_length)
+        rows = [(symbol, data[symbol][self.timeframe]) for symbol in symbols]
+        rows = [(symbol, ohlcv[-self.sma_length:]) for symbol, ohlcv in rows
+                if ohlcv and len(ohlcv) >= self.sma_length]  # Too little history: detect_regime says UNKNOWN
+        if not rows:
+            return []
+        matrix = np.array([ohlcv for _, ohlcv in rows], dtype=np.float64)  # symbols x bars x OHLCV
+        closes, volumes = matrix[:, :, 4], matrix[:, :, 5]
+        mask = sma_trend_mask(closes, self.sma_length)
+        order = np.arange(len(rows))
+        if check_volume:
+            mask &= quote_volume_mask(closes, volumes, self.min_quote_volume, self.sma_length)
+            order = np.argsort(-(closes * volumes).mean(axis=1), kind='stable')
+        return [rows[i][0] for i in order if mask[i]]
+
+    def screen(self, metrics=NULL_METRICS):
+        """Runs both stages and returns the symbols that deserve the full analysis."""
+        symbols = self.universe()
+        liquid, used_tickers = self.volume_pass(symbols)
+        survivors = self.trend_pass(liquid, check_volume=not used_tickers)
+        if self.max_symbols:
+            survivors = survivors[:self.max_symbols]
+        metrics.incr('screen_universe', len(symbols))
+        metrics.incr('screen_liquid', len(liquid))
+        metrics.incr('screen_survivors', len(survivors))
+        logging.info(f"🔭 Screener: {len(symbols)} {self.quote} markets -> {len(liquid)} liquid "
+                     f"-> {len(survivors)} above SMA{self.sma_length} ({self.timeframe}).")
+        return survivors
@@ -0,0 +1,142 @@
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+
+# LABEL_0: Negative, LABEL_1: Neutral, LABEL_2: Positive
+LABEL_SCORES = {"LABEL_0": -1, "LABEL_1": 0, "LABEL_2": 1}
+
+
+class SentimentService:
+    def __init__(self, api_url, token=None, cache_ttl=3600, fallback_ttl=300, cache_size=10_000,
+                 max_batch=32, timeout=5.0, latency_budget=8.0):
+        """Scores text in [-1, 1] through the Hugging Face endpoint with caching and a local fallback.
+
+        Remote calls never wait for a cold model: the service switches to VADER immediately and
+        retries the endpoint once the reported warm-up time has passed. `latency_budget` caps the
+        total seconds a single score_many call may spend on HTTP before falling back locally.
+        """
+        self.api_url = api_url
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.cache_ttl = cache_ttl
+        self.fallback_ttl = fallback_ttl
+        self.cache_size = cache_size
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.latency_budget = latency_budget
+
+        self._session = None
+        self._cache = OrderedDict()  # text hash -> (score, expires_at)
+        self._remote_ready_at = 0.0
+        self._vader = None
+
+    @property
+    def session(self):
+        """The keep-alive HTTP session, built on the first remote call so requests is only imported then."""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            self._session = requests.Session()
+            self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+        return self._session
+
+    def score(self, text):
+        """Returns the sentiment of one text (0 for empty input)."""
+        return self.score_many([text])[0]
+
+    def score_many(self, texts):
+        """Returns one score per text; cached texts cost nothing and misses go out in batches."""
+        now = time.time()
+        self._evict(now)
+
+        scores = [0.0] * len(texts)
+        missing = OrderedDict()  # hash -> (text, [positions])
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            cached = self._cache.get(key)
+            if cached:
+                self._cache.move_to_end(key)
+                scores[i] = cached[0]
+            else:
+                missing.setdefault(key, (text[:512], []))[1].append(i)
+
+        if not missing:
+            return scores
+
+        keys = list(missing)
+        remote = self._score_remote([missing[key][0] for key in keys])
+        pending = [key for key, value in zip(keys, remote) if value is None]
+        local = dict(zip(pending, self._score_local([missing[key][0] for key in pending])))
+
+        expires_remote, expires_local = now + self.cache_ttl, now + self.fallback_ttl
+        for key, value in zip(keys, remote):
+            if value is None:
+                value, expires_at = local[key], expires_local
+            else:
+                expires_at = expires_remote
+            self._cache[key] = (value, expires_at)
+            for i in missing[key][1]:
+                scores[i] = value
+        self._evict(now)
+        return scores
+
+    def _score_remote(self, texts):
+        """Scores texts through the endpoint in batches; entries it could not score stay None."""
+        results = [None] * len(texts)
+        if not self.headers or time.time() < self._remote_ready_at:
+            return results
+
+        started = time.monotonic()
+        for lo in range(0, len(texts), self.max_batch):
+            if time.monotonic() - started > self.latency_budget:
+                logging.warning("⚠️ Sentiment latency budget spent. Scoring the rest locally.")
+                break
+            batch = texts[lo:lo + self.max_batch]
+            payload = {"inputs": batch, "options": {"wait_for_model": False}}
+            try:
+                response = self.session.post(self.api_url, headers=self.headers, json=payload,
+                                             timeout=(3.05, self.timeout))
+                result = response.json()
+            except Exception as e:
+                logging.error(f"API Sentiment failed: {e}")
+                break
+
+            # Model loading (503): don't sleep in the trading loop, come back after the warm-up
+            if isinstance(result, dict):
+                wait_time = float(result.get("estimated_time", 60))
+                self._remote_ready_at = time.time() + wait_time
+                logging.info(f"AI Model is warming up ({wait_time:.0f}s). Using local sentiment meanwhile.")
+                break
+
+            for offset, labels in enumerate(result[:len(batch)]):
+                try:
+                    top_result = max(labels, key=lambda x: x['score'])
+                    results[lo + offset] = LABEL_SCORES.get(top_result['label'], 0) * top_result['score']
+                except Exception:
+                    results[lo + offset] = None
+        return results
+
+    def _score_local(self, texts):
+        """VADER compound scores, already on the same [-1, 1] scale."""
+        if not texts:
+            return []
+        if self._vader is None:
+            try:
+                from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+                self._vader = SentimentIntensityAnalyzer()
+            except ImportError:
+                logging.warning("⚠️ vaderSentiment is not installed. Local sentiment defaults to neutral.")
+                self._vader = False
+        if not self._vader:
+            return [0.0] * len(texts)
+        return [self._vader.polarity_scores(text)['compound'] for text in texts]
+
+    def _evict(self, now):
+        """Drops expired entries, then the least recently used ones beyond cache_size."""
+        expired = [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]
+        for key in expired:
+            del self._cache[key]
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
@@ -0,0 +1,75 @@
+import sys
+import time
+import atexit
+import builtins
+from contextlib import contextmanager
+
+_enabled = False
+_started = None
+_imports = []   # (module, inclusive seconds, self seconds, depth)
+_stages = []    # (stage, seconds)
+_stack = []
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """Times first-time absolute imports, splitting each into inclusive and self time."""
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    depth = len(_stack)
+    _stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        _imports.append((name, elapsed, elapsed - children, depth))
+
+
+def enable_if_requested(argv=None):
+    """Turns profiling on when --profile-startup is on the command line; call it before heavy imports."""
+    global _enabled, _started
+    argv = sys.argv if argv is None else argv
+    if _enabled or '--profile-startup' not in argv:
+        return
+    _enabled = True
+    _started = time.perf_counter()
+    builtins.__import__ = _timed_import
+    atexit.register(report)
+
+
+@contextmanager
+def stage(name):
+    """Times an initialization step; a no-op unless profiling is enabled."""
+    if not _enabled:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _stages.append((name, time.perf_counter() - started))
+
+
+def report(top=15):
+    """Prints the slowest imports (by inclusive time) and every timed initialization stage."""
+    total = time.perf_counter() - _started
+    print("\n" + "=" * 60)
+    print("⏱️ STARTUP PROFILE")
+    print("=" * 60)
+    print(f"{'Import':<36}{'Incl (ms)':>12}{'Self (ms)':>12}")
+    for name, inclusive, own, depth in sorted(_imports, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"{('  ' * min(depth, 3) + name)[:36]:<36}{inclusive * 1000:>12.1f}{own * 1000:>12.1f}")
+    top_level = sum(inclusive for _, inclusive, _, depth in _imports if depth == 0)
+    print(f"{'All first-time imports':<36}{top_level * 1000:>12.1f}")
+    if _stages:
+        print("-" * 60)
+        print(f"{'Initialization':<36}{'Time (ms)':>12}")
+        for name, seconds in _stages:
+            print(f"{name[:36]:<36}{seconds * 1000:>12.1f}")
+    print("-" * 60)
+    print(f"{'Total since profiling started':<36}{total * 1000:>12.1f}")
+    print("=" * 60)
@@ -0,0 +1,381 @@
+import os
+import sys
+import json
+import time
+import queue
+import asyncio
+import logging
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from candle_store import timeframe_to_ms
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class CandleFeed(ABC):
+    """Source of market events for StreamRunner.
+
+    events() yields dicts of one of two shapes:
+      {'type': 'trade', 'symbol': ..., 'timestamp': ms, 'price': ..., 'amount': ...}
+      {'type': 'kline', 'symbol': ..., 'timeframe': ..., 'candle': [ts, o, h, l, c, v], 'closed': bool}
+    """
+
+    @abstractmethod
+    def events(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ReplayFeed(CandleFeed):
+    def __init__(self, path, speed=0):
+        """Replays a JSON-lines event file; speed=0 runs as fast as possible, N runs at N x real time."""
+        self.path = path
+        self.speed = speed
+
+    def events(self):
+        prev_ts = None
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                ts = event['timestamp'] if event['type'] == 'trade' else event['candle'][0]
+                if self.speed and prev_ts is not None and ts > prev_ts:
+                    time.sleep((ts - prev_ts) / 1000.0 / self.speed)
+                prev_ts = ts
+                yield event
+
+    @staticmethod
+    def write(path, events):
+        """Writes events to a replay file and returns how many were written."""
+        count = 0
+        with open(path, "w", encoding="utf-8") as f:
+            for event in events:
+                f.write(json.dumps(event) + "\n")
+                count += 1
+        return count
+
+    @staticmethod
+    def klines_from_candles(symbol, timeframe, ohlcv):
+        """Turns stored candles into closed-kline events."""
+        for candle in ohlcv:
+            yield {'type': 'kline', 'symbol': symbol, 'timeframe': timeframe, 'candle': list(candle), 'closed': True}
+
+
+class CcxtProFeed(CandleFeed):
+    def __init__(self, exchange_name, symbols, params=None, max_queue=10_000):
+        """Live trade stream through ccxt.pro websockets, bridged from asyncio into a plain iterator.
+
+        The event loop never blocks on the bridge: when the consumer falls `max_queue` events
+        behind, the oldest queued event is dropped to make room (counted in `dropped`).
+        """
+        self.exchange_name = exchange_name
+        self.symbols = symbols
+        self.params = params or {}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self.dropped = 0
+
+    def _offer(self, event):
+        """Queues an event without blocking the event loop, dropping the oldest one when full."""
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    continue
+                if self.dropped % 1000 == 0:
+                    logging.warning(f"⚠️ Stream consumer is behind: dropping oldest events ({self.dropped + 1} so far).")
+                self.dropped += 1
+
+    async def _watch(self, exchange, symbol):
+        while not self._stop.is_set():
+            try:
+                for trade in await exchange.watch_trades(symbol):
+                    self._offer({'type': 'trade', 'symbol': symbol, 'timestamp': trade['timestamp'],
+                                 'price': trade['price'], 'amount': trade['amount']})
+            except Exception as e:
+                logging.error(f"❌ Trade stream error for {symbol}: {e}")
+                await asyncio.sleep(1)
+
+    async def _run(self):
+        import ccxt.pro as ccxtpro
+        exchange = getattr(ccxtpro, self.exchange_name)(self.params)
+        try:
+            await asyncio.gather(*(self._watch(exchange, symbol) for symbol in self.symbols))
+        finally:
+            await exchange.close()
+
+    def events(self):
+        threading.Thread(target=lambda: asyncio.run(self._run()), daemon=True).start()
+        while not self._stop.is_set():
+            try:
+                yield self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+    def close(self):
+        self._stop.set()
+
+
+class CandleBuilder:
+    def __init__(self, timeframe):
+        """Builds the in-progress candle of one timeframe for every symbol."""
+        self.timeframe = timeframe
+        self.step = timeframe_to_ms(timeframe)
+        self.current = {}
+
+    def on_trade(self, symbol, ts, price, amount):
+        """Folds a trade in; returns the previous candle if this trade opened a new bar."""
+        bucket = int(ts) // self.step * self.step
+        bar = self.current.get(symbol)
+        if bar is not None and bucket == bar[0]:
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += amount
+            return None
+        if bar is not None and bucket < bar[0]:
+            return None  # Late trade for a bar that already closed
+        self.current[symbol] = [bucket, price, price, price, price, amount]
+        return bar
+
+    def on_candle(self, symbol, candle):
+        """Folds a closed lower-timeframe candle in; returns the previous bar if this one starts a new bucket."""
+        bucket = int(candle[0]) // self.step * self.step
+        bar = self.current.get(symbol)
+        if bar is not None and bucket == bar[0]:
+            bar[2] = max(bar[2], candle[2])
+            bar[3] = min(bar[3], candle[3])
+            bar[4] = candle[4]
+            bar[5] += candle[5]
+            return None
+        if bar is not None and bucket < bar[0]:
+            return None
+        self.current[symbol] = [bucket, candle[1], candle[2], candle[3], candle[4], candle[5]]
+        return bar
+
+    def on_kline(self, symbol, candle, closed):
+        """Tracks a kline of this timeframe; returns the candle that is now known to be closed."""
+        bar = self.current.get(symbol)
+        if closed:
+            if bar is not None and bar[0] <= candle[0]:
+                del self.current[symbol]
+            return list(candle)
+        self.current[symbol] = list(candle)
+        if bar is not None and candle[0] > bar[0]:
+            return bar  # The feed moved on without sending a closed flag
+        return None
+
+    def close_if_complete(self, symbol, end_ts):
+        """Closes the symbol's bar if it ends at or before `end_ts` (ms)."""
+        bar = self.current.get(symbol)
+        if bar is not None and bar[0] + self.step <= end_ts:
+            del self.current[symbol]
+            return bar
+        return None
+
+    def forming(self, symbol):
+        bar = self.current.get(symbol)
+        return list(bar) if bar else None
+
+
+class StreamRunner:
+    def __init__(self, feed, on_bar_close, base_timeframe='1h', higher_timeframes=('4h', '1d'),
+                 history=100, min_bars=50):
+        """Turns feed events into closed bars and calls `on_bar_close(symbol, tf_data, candle)`
+        the moment a base-timeframe bar closes.
+
+        tf_data maps every timeframe (highest first) to its closed history, with the forming
+        higher-timeframe bar appended, which is the same shape fetch_data returns.
+        """
+        self.feed = feed
+        self.on_bar_close = on_bar_close
+        self.base = base_timeframe
+        self.higher = tuple(higher_timeframes)
+        self.base_step = timeframe_to_ms(base_timeframe)
+        self.builders = {tf: CandleBuilder(tf) for tf in (self.base,) + self.higher}
+        self.history = {}
+        self.history_size = history
+        self.min_bars = min_bars
+        self.stats = {'events': 0, 'bars': 0, 'analyses': 0, 'latencies': []}
+
+    def seed(self, symbol, timeframe, ohlcv, forming=None):
+        """Preloads closed history (e.g. from REST or the candle store) so analysis can start immediately."""
+        self._history(symbol, timeframe).extend(list(c) for c in ohlcv)
+        if forming:
+            self.builders[timeframe].current[symbol] = list(forming)
+
+    def _history(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        if key not in self.history:
+            self.history[key] = deque(maxlen=self.history_size)
+        return self.history[key]
+
+    def run(self, max_events=None):
+        started = time.perf_counter()
+        try:
+            for event in self.feed.events():
+                received = time.perf_counter()
+                self.stats['events'] += 1
+                if event['type'] == 'trade':
+                    self._on_trade(event, received)
+                elif event['type'] == 'kline' and event['timeframe'] == self.base:
+                    self._on_base_kline(event, received)
+                if max_events and self.stats['events'] >= max_events:
+                    break
+        finally:
+            self.feed.close()
+        self.stats['elapsed'] = time.perf_counter() - started
+        return self.stats
+
+    def _on_trade(self, event, received):
+        symbol = event['symbol']
+        closed = self.builders[self.base].on_trade(symbol, event['timestamp'], event['price'], event['amount'])
+        if closed:
+            # Emit the base bar before this trade reaches the higher timeframes: those that end with
+            # it are closed into history, and none has started a bucket that includes the trade yet
+            end_ts = closed[0] + self.base_step
+            for tf in self.higher:
+                complete = self.builders[tf].close_if_complete(symbol, end_ts)
+                if complete:
+                    self._history(symbol, tf).append(complete)
+            self._close_base(symbol, closed, received)
+        for tf in self.higher:
+            complete = self.builders[tf].on_trade(symbol, event['timestamp'], event['price'], event['amount'])
+            if complete:
+                self._history(symbol, tf).append(complete)
+
+    def _on_base_kline(self, event, received):
+        symbol = event['symbol']
+        closed = self.builders[self.base].on_kline(symbol, event['candle'], event.get('closed', False))
+        if not closed:
+            return
+        end_ts = closed[0] + self.base_step
+        for tf in self.higher:
+            builder = self.builders[tf]
+            for complete in (builder.on_candle(symbol, closed), builder.close_if_complete(symbol, end_ts)):
+                if complete:
+                    self._history(symbol, tf).append(complete)
+        self._close_base(symbol, closed, received)
+
+    def _close_base(self, symbol, candle, received):
+        self.stats['bars'] += 1
+        self._history(symbol, self.base).append(candle)
+
+        tf_data = {}
+        for tf in reversed(self.higher):
+            bars = list(self._history(symbol, tf))
+            forming = self.builders[tf].forming(symbol)
+            tf_data[tf] = bars + [forming] if forming else bars
+        tf_data[self.base] = list(self._history(symbol, self.base))
+        if any(len(bars) < self.min_bars for bars in tf_data.values()):
+            return
+
+        try:
+            self.on_bar_close(symbol, tf_data, candle)
+            self.stats['analyses'] += 1
+        except Exception as e:
+            logging.error(f"❌ Stream analysis failed for {symbol}: {e}")
+        self.stats['latencies'].append(time.perf_counter() - received)
+
+
+def make_pipeline(db=None, collector=None):
+    """Builds the on_bar_close callback that runs main.analyze_symbol on each closed bar."""
+    import main as scanner
+    from technical_analysis import TechnicalAnalysis
+    from ai_regime import AIRegimeDetector
+
+    analyzer, ai_bot = TechnicalAnalysis(), AIRegimeDetector()
+
+    def on_bar_close(symbol, tf_data, candle):
+        close_hour = time.gmtime((candle[0] + timeframe_to_ms('1h')) / 1000).tm_hour
+        decision = scanner.analyze_symbol(symbol, tf_data, collector, analyzer, ai_bot, db, hour_of_day=close_hour)
+        if decision and decision['status'] == 'ELITE':
+            logging.info(f"🚀 {symbol} ELITE at {decision['price']:.4f}")
+    return on_bar_close
+
+
+def report(stats):
+    latencies = sorted(stats['latencies'])
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else 0.0
+    elapsed = stats.get('elapsed', 0) or 1e-9
+    print("\n" + "=" * 40)
+    print("📡 STREAM RUN SUMMARY")
+    print("=" * 40)
+    print(f"Events:          {stats['events']} ({stats['events'] / elapsed:,.0f}/s)")
+    print(f"Bars closed:     {stats['bars']}")
+    print(f"Analyses:        {stats['analyses']}")
+    print(f"Close->decision: p50 {pick(0.5):.1f} ms | p95 {pick(0.95):.1f} ms")
+    print("=" * 40)
+
+
+def build_replay(path, symbols, days, config):
+    """Downloads (or reads from the candle store) 1h history and writes it as a replay file."""
+    from data_collection import DataCollector
+    collector = DataCollector(config)
+    events = []
+    for symbol in symbols:
+        ohlcv = collector.fetch_data(symbol, '1h', days * 24) or []
+        events.extend(ReplayFeed.klines_from_candles(symbol, '1h', ohlcv))
+    events.sort(key=lambda e: e['candle'][0])
+    return ReplayFeed.write(path, events)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Streaming candle mode")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--replay', help="Replay a JSON-lines event file")
+    mode.add_argument('--live', action='store_true', help="Stream live trades through ccxt.pro")
+    mode.add_argument('--make-replay', help="Write a replay file from 1h history")
+    parser.add_argument('--speed', type=float, default=0, help="Replay speed multiple (0 = as fast as possible)")
+    parser.add_argument('--exchange', default='bitget')
+    parser.add_argument('--symbols', default="BTC/USDT,ETH/USDT")
+    parser.add_argument('--days', type=int, default=120)
+    parser.add_argument('--db', help="Save decisions to this signals DB (omit to only log them)")
+    args = parser.parse_args(argv)
+    symbols = [s.strip() for s in args.symbols.split(',') if s.strip()]
+
+    if args.make_replay:
+        config = {'CANDLE_DB_PATH': os.getenv('CANDLE_DB_PATH', 'candles.db')}
+        count = build_replay(args.make_replay, symbols, args.days, config)
+        logging.info(f"✅ Wrote {count} events to {args.make_replay}")
+        return
+
+    db = None
+    if args.db:
+        from database_manager import DatabaseManager
+        db = DatabaseManager(args.db)
+
+    feed = ReplayFeed(args.replay, args.speed) if args.replay else CcxtProFeed(args.exchange, symbols)
+    collector = None
+    if args.live:
+        from data_collection import DataCollector
+        import main as scanner
+        collector = DataCollector(scanner.build_config())
+
+    runner = StreamRunner(feed, make_pipeline(db, collector))
+    if collector:
+        # Warm up from REST: closed bars become history, the last bar keeps forming from live trades
+        for symbol in symbols:
+            for tf in (runner.base,) + runner.higher:
+                ohlcv = collector.fetch_data(symbol, tf, 100) or []
+                runner.seed(symbol, tf, ohlcv[:-1], forming=ohlcv[-1] if ohlcv else None)
+    try:
+        report(runner.run())
+    finally:
+        if collector:
+            collector.close()
+        if db:
+            db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,39 +1,87 @@
+import numpy as np
 import pandas as pd
 import logging
+from candles import CandleArray
+from indicator_engine import IndicatorState, RSI_LENGTH, ADX_LENGTH, ATR_LENGTH, EMA_LENGTHS
+
+
+def _smooth(values, alpha, seed_length=None):
+    """Recursive average y += alpha * (x - y) from the first valid value; NaN inputs hold the previous value.
+
+    With `seed_length`, the recursion starts from the SMA of the first `seed_length` values.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if seed_length:
+        if len(values) < seed_length:
+            return np.full(len(values), np.nan)
+        values = values.copy()
+        values[seed_length - 1] = values[:seed_length].mean()
+        values[:seed_length - 1] = np.nan
+    return pd.Series(values).ewm(alpha=alpha, adjust=False, ignore_na=True).mean().to_numpy()
+
+
+def indicator_columns(high, low, close):
+    """RSI/ADX/ATR/EMA columns for whole arrays, the vectorized twin of IndicatorState.
+
+    Same recurrences and seeding as the streaming fold, so a window's last row matches
+    latest_indicators(). benchmark.check_reference compares it with recorded pandas_ta output.
+    """
+    high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+    if not len(close):
+        return {column: close.copy() for column in ('rsi', 'adx', 'atr', *(f'ema_{n}' for n in EMA_LENGTHS))}
+    prev_close = np.r_[np.nan, close[:-1]]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tr = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(prev_close - low)))
+        atr = _smooth(tr, 1.0 / ATR_LENGTH, ATR_LENGTH)
+
+        change = close - prev_close
+        up = _smooth(np.maximum(change, 0.0), 1.0 / RSI_LENGTH)
+        down = np.abs(_smooth(np.minimum(change, 0.0), 1.0 / RSI_LENGTH))
+        rsi = np.where(up + down != 0, 100.0 * up / (up + down), np.nan)
+
+        move_up = high - np.r_[np.nan, high[:-1]]
+        move_down = np.r_[np.nan, low[:-1]] - low
+        plus = np.where((move_up > move_down) & (move_up > 0), move_up, 0.0)
+        minus = np.where((move_down > move_up) & (move_down > 0), move_down, 0.0)
+        plus[:1] = minus[:1] = np.nan  # The first bar has no previous bar to move from
+        dm_plus = _smooth(plus, 1.0 / ADX_LENGTH)
+        dm_minus = _smooth(minus, 1.0 / ADX_LENGTH)
+        total = dm_plus + dm_minus
+        dx = np.where(total != 0, 100.0 * np.abs(dm_plus - dm_minus) / total, np.nan)
+        dx[np.isnan(atr)] = np.nan  # DX only starts once ATR exists
+        adx = _smooth(dx, 1.0 / ADX_LENGTH)
+
+    columns = {'rsi': rsi, 'adx': adx, 'atr': atr}
+    for length in EMA_LENGTHS:
+        columns[f'ema_{length}'] = _smooth(close, 2.0 / (length + 1), length)
+    return columns
 
-# Universal Import to prevent ModuleNotFoundError
-try:
-    import pandas_ta_classic as ta
-except ImportError:
-    try:
-        import pandas_ta_openbb as ta
-    except ImportError:
-        import pandas_ta as ta
 
 class TechnicalAnalysis:
     def __init__(self):
         logging.info("Technical Analysis Module Initialized")
 
+    def latest_indicators(self, candles):
+        """RSI/ADX/ATR/EMA row of the last candle, folded over the window without a DataFrame.
+
+        Takes a CandleArray or ccxt rows and returns a dict (timestamp, close, rsi, adx, atr,
+        ema_20, ema_50) equal to calculate_indicators(df).iloc[-1] on the same window.
+        """
+        state = IndicatorState()
+        for candle in CandleArray.from_ohlcv(candles).rows():
+            state.update(candle)
+        return state.values()
+
     def calculate_indicators(self, df):
         try:
             # Ensure data is numeric
             for col in ['open', 'high', 'low', 'close', 'volume']:
                 df[col] = pd.to_numeric(df[col])
 
-            # RSI
-            df['rsi'] = ta.rsi(df['close'], length=14)
-            
-            # ADX
-            adx_df = ta.adx(df['high'], df['low'], df['close'], length=14)
-            df['adx'] = adx_df['ADX_14']
-            
-            # ATR for SL/TP
-            df['atr'] = ta.atr(df['high'], df['low'], df['close'], length=14)
-            
-            # EMA for Trend Detection
-            df['ema_20'] = ta.ema(df['close'], length=20)
-            df['ema_50'] = ta.ema(df['close'], length=50)
-            
+            # RSI, ADX, ATR (for SL/TP) and the trend EMAs, with the same formulas as latest_indicators
+            for column, values in indicator_columns(df['high'], df['low'], df['close']).items():
+                df[column] = values
+
             return df
         except Exception as e:
             logging.error(f"Error calculating indicators: {e}")
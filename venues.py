@@ -0,0 +1,199 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from metrics import percentile
+
+
+class Venue:
+    def __init__(self, exchange, window=100, failure_threshold=3, cooldown=30.0):
+        """One exchange client plus its rolling latency/error window and circuit breaker.
+
+        After `failure_threshold` consecutive failures the breaker opens for `cooldown` seconds;
+        then a trial request is let through (half-open) and a success closes it again.
+        """
+        self.exchange = exchange
+        self.name = getattr(exchange, 'id', type(exchange).__name__)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._consecutive_failures = 0
+        self._open_until = 0.0
+        self._next_request_at = 0.0
+        self.served = 0
+        self.trips = 0
+
+    def available(self):
+        """False while the breaker is open; True when closed or ready for a half-open trial."""
+        return time.monotonic() >= self._open_until
+
+    def throttle(self):
+        """Spaces this venue's request start times by its own rateLimit."""
+        interval = getattr(self.exchange, 'rateLimit', 0) / 1000.0
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_request_at)
+            self._next_request_at = start_at + interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def record(self, seconds, ok):
+        """Adds one request outcome; returns True if this failure tripped the breaker."""
+        with self._lock:
+            self._outcomes.append(ok)
+            if ok:
+                self._latencies.append(seconds)
+                self._consecutive_failures = 0
+                self._open_until = 0.0
+                return False
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._open_until = time.monotonic() + self.cooldown
+                self.trips += 1
+                return True
+            return False
+
+    def p95(self, min_samples=1):
+        """Rolling p95 latency of successful requests, None until `min_samples` are known."""
+        with self._lock:
+            if len(self._latencies) < max(1, min_samples):
+                return None
+            return percentile(sorted(self._latencies), 95)
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._latencies)
+            outcomes = list(self._outcomes)
+        return {
+            'requests': len(outcomes),
+            'error_rate': (outcomes.count(False) / len(outcomes)) if outcomes else 0.0,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'served': self.served,
+            'breaker': 'open' if not self.available() else 'closed',
+        }
+
+
+class MultiVenueSource:
+    def __init__(self, exchanges, min_samples=20, initial_hedge_delay=2.0, min_hedge_delay=0.05,
+                 max_workers=16, on_event=None, **venue_options):
+        """A ccxt-compatible facade that serves market data from several exchanges, preferred first.
+
+        Each call goes to the first venue whose breaker is closed. If it has not answered within
+        its own rolling p95 (`initial_hedge_delay` until `min_samples` latencies are known), the
+        same request is hedged to the next venue and whichever succeeds first is returned. A failed
+        request fails over to the next venue immediately. `last_venue` (per thread) names the
+        venue that served the most recent call, and `on_event(name)` receives 'hedged',
+        'failover', 'breaker_open_<venue>' and 'served_<venue>' events.
+
+        Exchanges only need the ccxt methods that are called on them, so tests can pass fakes.
+        """
+        if not exchanges:
+            raise ValueError("MultiVenueSource needs at least one exchange")
+        self.venues = [Venue(exchange, **venue_options) for exchange in exchanges]
+        self.min_samples = min_samples
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.on_event = on_event or (lambda name: None)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="venue")
+        self._local = threading.local()
+
+        primary = self.venues[0].exchange
+        self.id = self.venues[0].name  # Candle store key: the preferred venue
+        self.rateLimit = 0  # Venues throttle themselves
+        self.has = getattr(primary, 'has', {})
+
+    @property
+    def last_venue(self):
+        return getattr(self._local, 'venue', None)
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        extra = {'params': params} if params else {}
+        return self.call('fetch_ohlcv', symbol, timeframe, since=since, limit=limit, **extra)
+
+    def fetch_ticker(self, symbol):
+        return self.call('fetch_ticker', symbol)
+
+    def fetch_tickers(self, symbols=None):
+        return self.call('fetch_tickers', symbols)
+
+    def load_markets(self, reload=False):
+        """Loads markets on every venue so a failover never pays for it mid-cycle."""
+        for venue in self.venues:
+            try:
+                venue.exchange.load_markets(reload)
+            except Exception as e:
+                logging.warning(f"⚠️ Could not load markets on {venue.name}: {e}")
+        return self.venues[0].exchange.markets if hasattr(self.venues[0].exchange, 'markets') else None
+
+    def stats(self):
+        return {venue.name: venue.stats() for venue in self.venues}
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+
+    def _timed(self, venue, method, args, kwargs):
+        """Runs one request on one venue and feeds its latency/outcome into the venue window."""
+        venue.throttle()
+        started = time.monotonic()
+        try:
+            result = getattr(venue.exchange, method)(*args, **kwargs)
+        except Exception:
+            if venue.record(time.monotonic() - started, False):
+                logging.warning(f"🔌 Circuit breaker opened for {venue.name}.")
+                self.on_event(f"breaker_open_{venue.name}")
+            raise
+        venue.record(time.monotonic() - started, True)
+        return result
+
+    def _hedge_delay(self, venue):
+        p95 = venue.p95(self.min_samples)
+        if p95 is None:
+            return self.initial_hedge_delay
+        return max(self.min_hedge_delay, p95)
+
+    def call(self, method, *args, **kwargs):
+        """Runs `method` with hedging and failover; raises the last error if every venue failed."""
+        self._local.venue = None
+        candidates = [venue for venue in self.venues if venue.available()] or self.venues[:1]
+        pending = {}  # future -> venue
+        last_error = None
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            venue = candidates[next_index]
+            next_index += 1
+            pending[self._pool.submit(self._timed, venue, method, args, kwargs)] = venue
+            return venue
+
+        timeout = self._hedge_delay(launch())
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # The request in flight is slower than its venue's p95: race the next venue
+                if next_index < len(candidates):
+                    self.on_event('hedged')
+                    timeout = self._hedge_delay(launch())
+                else:
+                    timeout = None
+                continue
+            for future in done:
+                venue = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    logging.warning(f"⚠️ {method} failed on {venue.name}: {e}")
+                    if not pending and next_index < len(candidates):
+                        self.on_event('failover')
+                        timeout = self._hedge_delay(launch())
+                    continue
+                venue.served += 1
+                self._local.venue = venue.name
+                self.on_event(f"served_{venue.name}")
+                return result
+        raise last_error